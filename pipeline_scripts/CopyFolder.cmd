@@ -8,6 +8,8 @@ robocopy %~dp0\..\preheaders %~dp0\..\%1\preheaders /e
 robocopy %~dp0\..\logs\dotCover  %~dp0\..\%1\unittestCoverage /e
 REM Xcopy /E /I "%~dp0\doc" "%~dp0\%1\doc"
 robocopy %~dp0\..\documentation %~dp0\..\%1\documentation /e
+REM DocParser.py -bundle also packs the documentation into one zip, published next to the folder for DocParser.py -serve
+if exist "%~dp0\..\documentation.zip" robocopy %~dp0\.. %~dp0\..\%1 documentation.zip
 #robocopy %~dp0\..\%1 \\amr.corp.intel.com\ec\proj\mdl\jf\intel\tpapps\jflibs\prime\staging\%1 /e
 robocopy %~dp0\..\%1 \\amr.corp.intel.com\ec\proj\mdl\jf\intel\tpapps\userlibs\mtl\staging\%1 /e
 if exist "%~dp0\..\%1" RMDIR /Q /S "%~dp0\..\%1"
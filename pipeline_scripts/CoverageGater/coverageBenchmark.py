@@ -0,0 +1,118 @@
+"""Times each phase of gating a synthetic dotCover report and records its peak
+memory, so scaling regressions show up across versions of coverage_tools.
+Results are saved as JSON, one file per run.
+
+usage: coverageBenchmark.py [--Assemblies N] [--Namespaces N] [--Types N] [--Methods N]
+                            [--AnonymousMethods N] [--Seed N] [--Repeat N]
+                            [--Label TEXT] [--Output PATH] [--Report PATH]"""
+from coverage_tools import *
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource # not available on Windows
+except ImportError:
+    resource = None
+
+def measurePhase(function, arguments: tuple, repeat: int) -> tuple:
+    '''Returns (result, best wall time, peak traced bytes) of a phase. The
+    timed runs are not traced, tracing slows allocations down several times,
+    so the peak comes from one extra traced run.'''
+    bestTime = None
+    result = None
+    with open(os.devnull, 'w') as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull # gater output would be timed along with the gating
+        try:
+            for _ in range(repeat):
+                startTime = time.perf_counter()
+                result = function(*arguments)
+                elapsed = time.perf_counter() - startTime
+                if bestTime is None or elapsed < bestTime:
+                    bestTime = elapsed
+
+            tracemalloc.start()
+            try:
+                function(*arguments)
+                _, peakBytes = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        finally:
+            sys.stdout = stdout
+
+    return result, bestTime, peakBytes
+
+def peakResidentBytes():
+    '''Peak resident memory of the process, None where it can't be read.'''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # kilobytes on Linux
+
+def runBenchmark(reportPath, coverageTarget, repeat: int) -> list:
+    '''Runs the phases of the assembly gate in order, each one on the output of the previous one.'''
+    scriptArgs = getArguments.Arguments(reportPath, coverageTarget, None, None)
+    phases = [
+        ("createJSONObject", jsonTextParser.createJSONObject, ()),
+        ("returnAllAssemblies", jsonObjectParser.returnAllAssemblies, ()),
+        ("returnCoverageDict", jsonObjectParser.returnCoverageDict, ()),
+        ("determineGatingAssemblies", gater.determineGatingAssemblies, (scriptArgs,))]
+
+    results = []
+    previous = reportPath
+    for name, function, extraArguments in phases:
+        previous, elapsed, peakBytes = measurePhase(function, (previous,) + extraArguments, repeat)
+        results.append({"Name": name, "Seconds": elapsed, "PeakTracedBytes": peakBytes})
+        print("Phase=[{}] Time=[{:.3f}s] PeakMemory=[{:.1f} MB]".format(name, elapsed, peakBytes / (1024 * 1024)))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the phases of coverage gating on a synthetic dotCover report.")
+    parser.add_argument("--Assemblies", type=int, default=50)
+    parser.add_argument("--Namespaces", type=int, default=5)
+    parser.add_argument("--Types", type=int, default=20)
+    parser.add_argument("--Methods", type=int, default=20)
+    parser.add_argument("--AnonymousMethods", type=int, default=0, help="Anonymous methods per method.")
+    parser.add_argument("--Seed", type=int, default=0)
+    parser.add_argument("--Target", type=float, default=85)
+    parser.add_argument("--Repeat", type=int, default=3, help="Runs per phase, the best one is reported.")
+    parser.add_argument("--Label", default="", help="Name of the version being measured, e.g. a commit.")
+    parser.add_argument("--Output", default="coverageBenchmark.json", help="Where the results are saved.")
+    parser.add_argument("--Report", default=None, help="Benchmark an existing report instead of a synthetic one.")
+    args = parser.parse_args()
+
+    shape = reportGenerator.ReportShape(args.Assemblies, args.Namespaces, args.Types, args.Methods, args.AnonymousMethods, args.Seed)
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        reportPath = args.Report
+        if reportPath is None:
+            reportPath = os.path.join(tempDir, "syntheticReport.json")
+            print("Writing synthetic report with {} nodes...".format(shape.nodeCount()))
+            reportGenerator.writeReport(reportPath, shape)
+
+        reportBytes = os.path.getsize(reportPath)
+        print("Report: {:.1f} MB".format(reportBytes / (1024 * 1024)))
+        phases = runBenchmark(reportPath, args.Target, args.Repeat)
+
+    benchmark = {
+        "Label": args.Label,
+        "Timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "Python": platform.python_version(),
+        "Platform": platform.platform(),
+        "JSONBackend": jsonBackend.getBackend().name,
+        "Report": {"Path": args.Report, "Bytes": reportBytes,
+                   "Shape": shape.toDict() if args.Report is None else None,
+                   "Nodes": shape.nodeCount() if args.Report is None else None},
+        "Phases": phases,
+        "PeakResidentBytes": peakResidentBytes()}
+
+    with open(args.Output, 'w') as writer:
+        writer.write(json.dumps(benchmark, indent=2))
+    print("Benchmark results written to [{}]".format(args.Output))
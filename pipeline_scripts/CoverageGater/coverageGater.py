@@ -1,12 +1,148 @@
 from coverage_tools import *
 import json
 import io
+import os
 import sys
 
-def parseAssemblyCoverage(jsonObject):
-    assemblies = jsonObjectParser.returnAllAssemblies(jsonObject)
-    assemblyCoverage = jsonObjectParser.returnCoverageDict(assemblies)
-    return assemblyCoverage
+def loadReportIndex(reportPaths, scriptArgs):
+    return reportMerger.mergeReports(reportPaths, scriptArgs.useCache, scriptArgs.cacheDirectory)
+
+def readAssemblyCoverage(reportPath, scriptArgs):
+    '''Assembly coverage from the cache when the report is in it, streamed
+    from the report otherwise. The stream is not faster than a full parse
+    (about as fast as json.load, slower than orjson), it is used because it
+    never holds the whole report in memory: a fifth of the peak memory.'''
+    if scriptArgs.useCache:
+        reportIndex = reportCache.findIndex(reportPath, scriptArgs.cacheDirectory)
+        if reportIndex is not None:
+            return reportIndex.coverageDict("Assembly")
+    streamParser = xmlStreamParser if xmlStreamParser.isXMLReport(reportPath) else jsonStreamParser
+    return jsonObjectParser.returnCoverageDict(streamParser.iterNodes(reportPath))
+
+def printHotspots(reportIndex, reportPaths, gatingNodes, scriptArgs):
+    if reportIndex is not None:
+        records = hotspotReport.indexRecords(reportIndex, gatingNodes)
+    else:
+        streamParser = xmlStreamParser if xmlStreamParser.isXMLReport(reportPaths[0]) else jsonStreamParser
+        records = hotspotReport.treeRecords(streamParser.iterTree(reportPaths[0]), gatingNodes)
+    hotspotReport.printHotspots(hotspotReport.findHotspots(records, scriptArgs.hotspotCount))
+
+def recordHistory(reportIndex, reportPaths, scriptArgs):
+    '''Appends the coverage of every node of the report to the history file.'''
+    connection = coverageHistory.openHistory(scriptArgs.historyPath)
+    try:
+        runId = coverageHistory.recordRun(connection, reportIndex, scriptArgs.commitId,
+                                          os.environ.get("GITHUB_REF_NAME"), ";".join(reportPaths))
+    finally:
+        connection.close()
+    print("Coverage recorded as run [{}] in [{}]\n".format(runId, scriptArgs.historyPath))
+
+def loadBaselineIndex(scriptArgs, baselineIndices: dict):
+    if scriptArgs.baselineReportPath not in baselineIndices:
+        baselineIndices[scriptArgs.baselineReportPath] = loadReportIndex([scriptArgs.baselineReportPath], scriptArgs)
+    return baselineIndices[scriptArgs.baselineReportPath]
+
+def determineChangedAssemblies(scriptArgs):
+    '''Returns the assemblies built from the changed files, None when every assembly is gated.'''
+    if not scriptArgs.changedFilesPath:
+        return None
+
+    assemblyMap = changeMapper.loadOrBuildAssemblyMap(scriptArgs.assemblyMapPath, scriptArgs.sourceDirectory)
+    changedPaths = changeMapper.readChangedPaths(scriptArgs.changedFilesPath)
+    assemblies = changeMapper.mapChangedPaths(changedPaths, assemblyMap)
+    print("{} changed files map to assemblies {}".format(len(changedPaths), sorted(assemblies)))
+    return assemblies
+
+def determineGatingScope(changedAssemblies: set, assemblyCoverage: dict, scriptArgs):
+    '''Returns the changed assemblies plus the ones of the current report that
+    are already below target, whether or not a baseline is gated against.'''
+    alreadyFailing = changeMapper.failingAssemblies(assemblyCoverage, coveragePolicy.createPolicy(scriptArgs))
+
+    # FailOverride may hold patterns, so the scope is a rule set rather than a set of names
+    failOverride = scriptArgs.failOverride or []
+    if alreadyFailing - changedAssemblies or failOverride:
+        print("Also gating already failing assemblies {}".format(sorted(alreadyFailing - changedAssemblies) + list(failOverride)))
+    print()
+
+    return coveragePolicy.RuleSet((name, True) for name in list(changedAssemblies | alreadyFailing) + list(failOverride))
+
+def scopeReportIndex(reportIndex, changedAssemblies, scriptArgs):
+    if changedAssemblies is None:
+        return reportIndex
+    gatingScope = determineGatingScope(changedAssemblies, reportIndex.coverageDict("Assembly"), scriptArgs)
+    return changeMapper.scopeIndex(reportIndex, gatingScope)
+
+def gateIndex(reportIndex, scriptArgs, baselineIndices: dict, results: list):
+    '''Gates one profile against the parsed report, baseline reports are loaded once and shared.'''
+    if scriptArgs.baselineReportPath:
+        return regressionGater.determineRegressions(loadBaselineIndex(scriptArgs, baselineIndices), reportIndex, scriptArgs, results)
+    return gater.determineGatingIndex(reportIndex, scriptArgs, results)
+
+def gateProfiles(reportIndex, scriptArgs, baselineIndices: dict, results: list) -> list:
+    '''Evaluates every profile against the same parsed report, returns
+    (profile, failing nodes) of every profile.'''
+    return [(profile, gateIndex(reportIndex, profile, baselineIndices, results)) for profile in scriptArgs.profiles]
+
+def printProfileVerdicts(verdicts: list) -> list:
+    '''Prints the verdict of every profile, returns the nodes failing in
+    profiles that are not informational.'''
+    gatingNodes = []
+    for profile, profileNodes in verdicts:
+        verdict = "PASS" if len(profileNodes) == 0 else "FAIL"
+        informational = " (informational)" if profile.informational else ""
+        print("Profile=[{}] Target=[{}] Verdict=[{}]{} - {}".format(
+            profile.profileName, profile.coverageTarget, verdict, informational, profileNodes))
+        if not profile.informational:
+            gatingNodes += [name for name in profileNodes if name not in gatingNodes]
+    print()
+
+    return gatingNodes
+
+def main():
+    scriptArgs = getArguments.getArguments()
+    reportPaths = scriptArgs.reportPaths()
+    reportIndex = None
+    baselineIndices = {}
+    results = []
+    if scriptArgs.watchInterval is not None:
+        baselineIndex = loadBaselineIndex(scriptArgs, baselineIndices) if scriptArgs.baselineReportPath else None
+        return reportWatcher.watch(reportPaths, scriptArgs, baselineIndex, scriptArgs.watchInterval)
+
+    changedAssemblies = determineChangedAssemblies(scriptArgs)
+
+    if scriptArgs.profiles:
+        reportIndex = loadReportIndex(reportPaths, scriptArgs)
+        if scriptArgs.historyPath:
+            recordHistory(reportIndex, reportPaths, scriptArgs)
+        reportIndex = scopeReportIndex(reportIndex, changedAssemblies, scriptArgs)
+        profileVerdicts = gateProfiles(reportIndex, scriptArgs, baselineIndices, results)
+    elif scriptArgs.gatingLevels == ["Assembly"] and not scriptArgs.baselineReportPath and len(reportPaths) == 1 and not scriptArgs.historyPath:
+        # assemblies alone don't need the deeper levels of the report
+        assemblyCoverage = readAssemblyCoverage(reportPaths[0], scriptArgs)
+        if changedAssemblies is not None:
+            gatingScope = determineGatingScope(changedAssemblies, assemblyCoverage, scriptArgs)
+            assemblyCoverage = changeMapper.scopeCoverageDict(assemblyCoverage, gatingScope)
+        gatingAssemblies = gater.determineGatingAssemblies(assemblyCoverage, scriptArgs, results)
+    else:
+        reportIndex = loadReportIndex(reportPaths, scriptArgs)
+        if scriptArgs.historyPath:
+            recordHistory(reportIndex, reportPaths, scriptArgs)
+        reportIndex = scopeReportIndex(reportIndex, changedAssemblies, scriptArgs)
+        gatingAssemblies = gateIndex(reportIndex, scriptArgs, baselineIndices, results)
+
+    for emitter in resultEmitter.createEmitters(scriptArgs):
+        emitter.emit(results)
+    if scriptArgs.profiles:
+        gatingAssemblies = printProfileVerdicts(profileVerdicts)
+
+    if len(gatingAssemblies) == 0:
+        print("All gating assemblies PASS")
+        return 0 # passing exit code for C programs
+    else:
+        if scriptArgs.hotspotCount > 0:
+            printHotspots(reportIndex, reportPaths, gatingAssemblies, scriptArgs)
+        print("{} gating assemblies FAILED - {}".format(len(gatingAssemblies), gatingAssemblies))
+        return 1 # failing exit code for C programs
 
 
 
@@ -14,17 +150,7 @@ def parseAssemblyCoverage(jsonObject):
 ############ Start of main ##############
 #########################################
 
-if __name__ != "__main__":
-    exit()
-
-scriptArgs = getArguments.getArguments()
-jsonObject = jsonTextParser.createJSONObject(scriptArgs.coverageReportPath)
-assemblyCoverage = parseAssemblyCoverage(jsonObject)
-gatingAssemblies = gater.determineGatingAssemblies(assemblyCoverage, scriptArgs)
-
-if len(gatingAssemblies) == 0:
-    print("All gating assemblies PASS")
-    sys.exit(0) # passing exit code for C programs
-else:
-    print("{} gating assemblies FAILED - {}".format(len(gatingAssemblies), gatingAssemblies))
-    sys.exit(1) # failing exit code for C programs
\ No newline at end of file
+# report parsing runs in worker processes, which import this script again
+# on Windows, so nothing may run outside of the main guard
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""Queries the coverage history written by coverageGater.py (--History).
+
+usage: coverageTrend.py --History PATH --Node NAME [--Kind KIND] [--Last N]
+       coverageTrend.py --History PATH --Drops POINTS [--Kind KIND]"""
+from coverage_tools import *
+import argparse
+import time
+
+def printTrend(connection, name, kind, count):
+    trend = coverageHistory.nodeTrend(connection, name, kind, count)
+    if not trend:
+        print("No history of {}=[{}]".format(kind, name))
+    for runId, commitId, timestamp, covered, total in trend:
+        print("Run=[{}] Commit=[{}] Time=[{}] Coverage=[{:.2f}] Covered=[{}/{}]".format(
+            runId, commitId, timestamp, regressionGater.ratio(covered, total), covered, total))
+
+def printDrops(connection, kind, threshold):
+    drops = coverageHistory.findDrops(connection, kind, threshold)
+    print("{} {} nodes dropped by more than [{}] points since the previous run".format(len(drops), kind, threshold))
+    for name, baselinePercent, currentPercent in drops:
+        print("{}=[{}] Coverage=[{:.2f} -> {:.2f}]".format(kind, name, baselinePercent, currentPercent))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queries the coverage history of previous gate runs.")
+    parser.add_argument("--History", required=True, help="History file written by coverageGater.py.")
+    parser.add_argument("--Node", help="Qualified name of the node to show the trend of.")
+    parser.add_argument("--Kind", default="Assembly", choices=getArguments.gatingLevelChoices)
+    parser.add_argument("--Last", type=int, default=50, help="Number of runs in the trend.")
+    parser.add_argument("--Drops", type=float, help="List the nodes that dropped by more than this many points.")
+    args = parser.parse_args()
+
+    connection = coverageHistory.openHistory(args.History)
+    startTime = time.perf_counter()
+    if args.Node:
+        printTrend(connection, args.Node, args.Kind, args.Last)
+    if args.Drops is not None:
+        printDrops(connection, args.Kind, args.Drops)
+    connection.close()
+    print("Query took {:.1f} ms".format((time.perf_counter() - startTime) * 1000))
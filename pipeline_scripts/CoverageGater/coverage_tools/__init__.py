@@ -1 +1 @@
-__all__ = ["getArguments","jsonTextParser","jsonObjectParser","gater"] 
\ No newline at end of file
+__all__ = ["getArguments","jsonTextParser","jsonObjectParser","jsonStreamParser","xmlStreamParser","jsonBackend","coverageIndex","regressionGater","reportCache","reportMerger","hotspotReport","changeMapper","coveragePolicy","gateResult","resultEmitter","reportGenerator","coverageHistory","reportWatcher","gater"] 
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""Maps the files changed by a PR to the assemblies they are built into, so PR
+builds only gate the assemblies they touch. The folder -> assembly index is
+built once from the .csproj layout and saved as JSON."""
+import json
+import os
+import re
+from coverage_tools import coverageIndex
+
+_assemblyNamePattern = re.compile(r'<AssemblyName>\s*([^<]+?)\s*</AssemblyName>')
+_projectReferencePattern = re.compile(r'<ProjectReference\s+Include="([^"]+\.csproj)"')
+
+# build output and tooling never contains project sources
+skippedDirectories = {".git", ".vs", "bin", "obj", "lib", "logs", "documentation", "node_modules"}
+
+def normalizePath(path) -> str:
+    '''Repo relative path with forward slashes, the form `git diff --name-only` prints.'''
+    path = path.strip().replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path.strip("/")
+
+def readProjectFile(projectPath) -> tuple:
+    '''Returns (assembly name, [referenced .csproj paths]) of a project file.'''
+    with open(projectPath, 'r', encoding='utf-8-sig', errors='replace') as reader:
+        projectText = reader.read()
+
+    projectName = os.path.splitext(os.path.basename(projectPath))[0]
+    assemblyName = projectName
+    match = _assemblyNamePattern.search(projectText)
+    if match:
+        assemblyName = match.group(1).replace("$(MSBuildProjectName)", projectName)
+
+    projectDirectory = os.path.dirname(projectPath)
+    references = [os.path.normpath(os.path.join(projectDirectory, reference.replace("\\", os.sep)))
+                  for reference in _projectReferencePattern.findall(projectText)]
+    return assemblyName, references
+
+def _findProjectFiles(rootDirectory):
+    pending = [rootDirectory]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in skippedDirectories:
+                        pending.append(entry.path)
+                elif entry.name.endswith(".csproj"):
+                    yield entry.path
+
+def buildAssemblyMap(sourceDirectory, repositoryRoot=".") -> dict:
+    '''Returns {project folder: [assemblies]} for the projects found under
+    sourceDirectory, folders relative to repositoryRoot. Unit test projects also map to the assemblies they reference, since
+    changing a test changes the coverage of the code under test.'''
+    projects = {}
+    for projectPath in _findProjectFiles(sourceDirectory):
+        projects[os.path.normpath(projectPath)] = readProjectFile(projectPath)
+
+    assemblyMap = {}
+    for projectPath, (assemblyName, references) in projects.items():
+        folder = normalizePath(os.path.relpath(os.path.dirname(projectPath), repositoryRoot))
+        assemblies = assemblyMap.setdefault(folder, [])
+        if assemblyName not in assemblies:
+            assemblies.append(assemblyName)
+
+        if assemblyName.endswith(".UnitTest"):
+            for reference in references:
+                if reference in projects and projects[reference][0] not in assemblies:
+                    assemblies.append(projects[reference][0])
+
+    return assemblyMap
+
+def saveAssemblyMap(assemblyMap: dict, mapPath):
+    with open(mapPath, 'w') as writer:
+        json.dump(assemblyMap, writer, indent=2, sort_keys=True)
+
+def loadAssemblyMap(mapPath) -> dict:
+    with open(mapPath, 'r') as reader:
+        return json.load(reader)
+
+def loadOrBuildAssemblyMap(mapPath, sourceDirectory, repositoryRoot=".") -> dict:
+    '''Loads the saved index, or builds it from the projects and saves it
+    when a map path is given.'''
+    if mapPath and os.path.exists(mapPath):
+        return loadAssemblyMap(mapPath)
+
+    assemblyMap = buildAssemblyMap(sourceDirectory, repositoryRoot)
+    if mapPath:
+        saveAssemblyMap(assemblyMap, mapPath)
+    return assemblyMap
+
+def readChangedPaths(changedFilesPath) -> list:
+    '''Reads a list of changed files, one per line (`git diff --name-only`).'''
+    with open(changedFilesPath, 'r', encoding='utf-8-sig', errors='replace') as reader:
+        return [line.strip() for line in reader if line.strip()]
+
+def mapChangedPaths(changedPaths, assemblyMap: dict) -> set:
+    '''Returns the assemblies built from the changed files. Each path is
+    matched to its closest project folder by walking up its parent
+    folders, so the cost scales with the number of changed files.'''
+    assemblies = set()
+    for changedPath in changedPaths:
+        folder = normalizePath(changedPath)
+        while folder:
+            folder = folder.rpartition("/")[0]
+            if folder in assemblyMap:
+                assemblies.update(assemblyMap[folder])
+                break
+    return assemblies
+
+def scopeIndex(reportIndex: coverageIndex.CoverageIndex, assemblies) -> coverageIndex.CoverageIndex:
+    '''Returns a copy of the index holding only the given assemblies and their
+    subtrees, so every gating level only sees the nodes of those assemblies.
+    `assemblies` is a set of names or a coveragePolicy.RuleSet.'''
+    scoped = coverageIndex.CoverageIndex()
+    root = scoped.append(reportIndex.kindNames[reportIndex.kinds[0]], reportIndex.names[0], -1,
+                         reportIndex.covered[0], reportIndex.total[0], reportIndex.percents[0])
+    for start, end in reportIndex.subtreeRanges(0):
+        if reportIndex.names[start] in assemblies:
+            scoped.appendSubtree(reportIndex, start, end, root)
+    return scoped
+
+def scopeCoverageDict(assemblyCoverage: dict, assemblies) -> dict:
+    return {name: coverage for name, coverage in assemblyCoverage.items() if name in assemblies}
+
+def failingAssemblies(assemblyCoverage: dict, policy) -> set:
+    '''Assemblies of the report that are below their target, judged the same
+    way the gater does (policy is a coveragePolicy.CoveragePolicy).'''
+    return {name for name, coverage in assemblyCoverage.items() if coverage < policy.target(name)}
@@ -0,0 +1,122 @@
+"""Append-only history of gate runs in a local SQLite file. Every run stores
+the statements of every node of its report, so trends and drops across builds
+are answered from the indexed history instead of re-reading old reports."""
+import datetime
+import sqlite3
+from coverage_tools import coverageIndex
+
+historyFormatVersion = 1
+
+# node names are stored once and referenced by id, most of them repeat every run
+_schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    commitId TEXT,
+    branch TEXT,
+    timestamp TEXT NOT NULL,
+    reportPath TEXT);
+CREATE INDEX IF NOT EXISTS runsByCommit ON runs (commitId);
+
+CREATE TABLE IF NOT EXISTS nodes (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (name, kind));
+CREATE INDEX IF NOT EXISTS nodesByKind ON nodes (kind);
+
+CREATE TABLE IF NOT EXISTS coverage (
+    nodeId INTEGER NOT NULL REFERENCES nodes (id),
+    runId INTEGER NOT NULL REFERENCES runs (id),
+    covered INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (nodeId, runId)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS coverageByRun ON coverage (runId);
+"""
+
+historyVersionExceptionMessage = "Coverage history file was written by an unsupported version."
+
+class HistoryVersionException(Exception):
+    pass
+
+def openHistory(historyPath) -> sqlite3.Connection:
+    '''Opens the history file, creating it on first use.'''
+    connection = sqlite3.connect(historyPath)
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version == 0:
+        connection.executescript(_schema)
+        connection.execute("PRAGMA user_version = {}".format(historyFormatVersion))
+        connection.commit()
+    elif version != historyFormatVersion:
+        connection.close()
+        raise HistoryVersionException(historyVersionExceptionMessage, historyPath, version)
+    return connection
+
+def _nodeIds(connection, keys: list) -> list:
+    '''Returns the id of every (name, kind), adding the nodes seen for the first time.'''
+    connection.executemany("INSERT OR IGNORE INTO nodes (name, kind) VALUES (?, ?)", keys)
+    idByKey = {}
+    for nodeId, name, kind in connection.execute("SELECT id, name, kind FROM nodes"):
+        idByKey[(name, kind)] = nodeId
+    return [idByKey[key] for key in keys]
+
+def recordRun(connection, reportIndex: coverageIndex.CoverageIndex, commitId=None, branch=None,
+              reportPath=None, timestamp=None) -> int:
+    '''Appends the coverage of every node of the report (the root excluded)
+    as a new run, in one transaction. Returns the id of the run.'''
+    if timestamp is None:
+        timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+
+    qualifiedNames = reportIndex.qualifiedNames()
+    nodes = [i for i, parent in enumerate(reportIndex.parents) if parent >= 0]
+    keys = [(qualifiedNames[i], reportIndex.kindNames[reportIndex.kinds[i]]) for i in nodes]
+
+    with connection:
+        runId = connection.execute(
+            "INSERT INTO runs (commitId, branch, timestamp, reportPath) VALUES (?, ?, ?, ?)",
+            (commitId, branch, timestamp, reportPath)).lastrowid
+        # a name repeated within a report (overloads merged by dotCover) keeps its first node
+        connection.executemany(
+            "INSERT OR IGNORE INTO coverage (nodeId, runId, covered, total) VALUES (?, ?, ?, ?)",
+            ((nodeId, runId, reportIndex.covered[i], reportIndex.total[i]) for nodeId, i in zip(_nodeIds(connection, keys), nodes)))
+    return runId
+
+def latestRuns(connection, count: int = 50) -> list:
+    '''Returns (runId, commitId, branch, timestamp) of the most recent runs, newest first.'''
+    return connection.execute(
+        "SELECT id, commitId, branch, timestamp FROM runs ORDER BY id DESC LIMIT ?", (count,)).fetchall()
+
+def nodeTrend(connection, name: str, kind: str = "Assembly", count: int = 50) -> list:
+    '''Returns (runId, commitId, timestamp, covered, total) of a node over its
+    last `count` runs, newest first.'''
+    return connection.execute(
+        """SELECT runs.id, runs.commitId, runs.timestamp, coverage.covered, coverage.total
+           FROM nodes
+           JOIN coverage ON coverage.nodeId = nodes.id
+           JOIN runs ON runs.id = coverage.runId
+           WHERE nodes.name = ? AND nodes.kind = ?
+           ORDER BY coverage.runId DESC LIMIT ?""", (name, kind, count)).fetchall()
+
+def findDrops(connection, kind: str, threshold: float, runId=None, baselineRunId=None) -> list:
+    '''Returns (name, baseline percent, current percent) of the nodes of a kind
+    whose coverage dropped by more than `threshold` points between two runs,
+    the latest run and the one before it by default. Largest drop first.
+    The nodes of the kind drive the join (CROSS JOIN fixes the order), so
+    assembly queries don't scan the method rows of the runs.'''
+    if runId is None:
+        runId = connection.execute("SELECT MAX(id) FROM runs").fetchone()[0]
+    if baselineRunId is None:
+        baselineRunId = connection.execute("SELECT MAX(id) FROM runs WHERE id < ?", (runId,)).fetchone()[0]
+    if runId is None or baselineRunId is None:
+        return []
+
+    return connection.execute(
+        """SELECT name, baselinePercent, currentPercent FROM (
+               SELECT nodes.name AS name,
+                      CASE WHEN baseline.total = 0 THEN 100.0 ELSE baseline.covered * 100.0 / baseline.total END AS baselinePercent,
+                      CASE WHEN current.total = 0 THEN 100.0 ELSE current.covered * 100.0 / current.total END AS currentPercent
+               FROM nodes
+               CROSS JOIN coverage AS current ON current.nodeId = nodes.id AND current.runId = ?
+               CROSS JOIN coverage AS baseline ON baseline.nodeId = nodes.id AND baseline.runId = ?
+               WHERE nodes.kind = ?)
+           WHERE baselinePercent - currentPercent > ?
+           ORDER BY currentPercent - baselinePercent""", (runId, baselineRunId, kind, threshold)).fetchall()
@@ -0,0 +1,190 @@
+"""Flattens the coverage report into parallel arrays so thresholds can be
+checked at any depth of the tree (Assembly, Namespace, Type, Method) with a
+single pass over the arrays instead of a walk of the nested report."""
+from array import array
+from coverage_tools import jsonObjectParser
+from coverage_tools import jsonStreamParser
+from coverage_tools import jsonTextParser
+from coverage_tools import xmlStreamParser
+
+# OwnCoverage leaves have no name and only repeat the statements of their method
+skippedKinds = ("OwnCoverage",)
+
+repeatNodeExceptionMessage = """Found more than one node of the same kind
+with the same fully qualified name in the coverage report."""
+
+class RepeatNodeException(jsonObjectParser.RepeatAssemblyException):
+    pass
+
+class CoverageIndex:
+    '''Node i of the report is described by kinds[i], names[i], parents[i],
+    covered[i], total[i] and percents[i]. Parents always come before their
+    children, the root is node 0 and has parent -1.'''
+
+    def __init__(self):
+        self.kindNames = []
+        self._kindCodes = {}
+        self.kinds = array('B')
+        self.names = []
+        self.parents = array('l')
+        self.covered = array('q')
+        self.total = array('q')
+        self.percents = array('h')
+        self._qualifiedNames = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def kindCode(self, kind: str) -> int:
+        '''Returns the code stored in `kinds` for a kind name, registering new kinds.'''
+        code = self._kindCodes.get(kind)
+        if code is None:
+            code = len(self.kindNames)
+            self._kindCodes[kind] = code
+            self.kindNames.append(kind)
+        return code
+
+    def lookupKind(self, kind: str):
+        '''Returns the code of a kind name, or None if no node of that kind was added.'''
+        return self._kindCodes.get(kind)
+
+    def append(self, kind: str, name: str, parent: int, covered: int, total: int, percent=None) -> int:
+        '''Adds a node and returns its index. The percent is derived from the
+        statements, the same way dotCover truncates it, when not given.'''
+        if percent is None:
+            percent = covered * 100 // total if total else 0
+
+        self.kinds.append(self.kindCode(kind))
+        self.names.append(name)
+        self.parents.append(parent)
+        self.covered.append(covered)
+        self.total.append(total)
+        self.percents.append(percent)
+        self._qualifiedNames = None
+        return len(self.names) - 1
+
+    def appendNode(self, node: dict, parent: int) -> int:
+        return self.append(
+            node.get("Kind", ""), node.get("Name", ""), parent,
+            node.get("CoveredStatements", 0), node.get("TotalStatements", 0),
+            node.get("CoveragePercent"))
+
+    def appendSubtree(self, source, start: int, end: int, parent: int) -> int:
+        '''Copies nodes start..end-1 of another index, a node and all of its
+        descendants, under `parent`. Returns the index of the copied node.'''
+        offset = len(self.names) - start
+        for i in range(start, end):
+            self.append(
+                source.kindNames[source.kinds[i]], source.names[i],
+                parent if i == start else source.parents[i] + offset,
+                source.covered[i], source.total[i], source.percents[i])
+        return start + offset
+
+    def subtreeRanges(self, parent: int = 0) -> list:
+        '''Returns (start, end) of the subtree of every child of `parent`.
+        Subtrees are contiguous because nodes are stored in pre-order.'''
+        starts = [i for i, nodeParent in enumerate(self.parents) if nodeParent == parent]
+        ranges = []
+        for position, start in enumerate(starts):
+            if position + 1 < len(starts):
+                end = starts[position + 1]
+            else:
+                # the last child's subtree ends with the first node outside of it
+                end = start + 1
+                subtree = {start}
+                while end < len(self.parents) and self.parents[end] in subtree:
+                    subtree.add(end)
+                    end += 1
+            ranges.append((start, end))
+        return ranges
+
+    def qualifiedNames(self) -> list:
+        '''Returns the dotted Assembly.Namespace.Type.Method name of every
+        node, built in one pass since parents precede their children.'''
+        if self._qualifiedNames is None:
+            qualifiedNames = []
+            for name, parent in zip(self.names, self.parents):
+                if parent <= 0:
+                    qualifiedNames.append(name)
+                else:
+                    qualifiedNames.append(qualifiedNames[parent] + "." + name)
+            self._qualifiedNames = qualifiedNames
+        return self._qualifiedNames
+
+    def select(self, kind: str) -> list:
+        '''Returns the indices of all nodes of a kind.'''
+        code = self.lookupKind(kind)
+        if code is None:
+            return []
+        return [i for i, nodeKind in enumerate(self.kinds) if nodeKind == code]
+
+    def belowTarget(self, kind: str, coverageTarget) -> list:
+        '''Returns the indices of the nodes of a kind whose coverage is under the target.'''
+        code = self.lookupKind(kind)
+        if code is None:
+            return []
+        return [i for i, (nodeKind, percent) in enumerate(zip(self.kinds, self.percents))
+                if nodeKind == code and percent < coverageTarget]
+
+    def coverageDict(self, kind: str = "Assembly") -> dict:
+        '''Same shape as jsonObjectParser.returnCoverageDict, for any kind of node.'''
+        qualifiedNames = self.qualifiedNames()
+        coverageDict = {}
+        for i in self.select(kind):
+            if qualifiedNames[i] in coverageDict:
+                raise RepeatNodeException(repeatNodeExceptionMessage, qualifiedNames[i])
+            coverageDict[qualifiedNames[i]] = self.percents[i]
+        return coverageDict
+
+def fromJSONObject(jsonObject: dict) -> CoverageIndex:
+    '''Flattens an already parsed report.'''
+    index = CoverageIndex()
+    pending = [(jsonObject, -1)]
+
+    while pending:
+        node, parent = pending.pop()
+        if node.get("Kind") in skippedKinds:
+            continue
+        nodeIndex = index.appendNode(node, parent)
+        # reversed so children keep their report order when popped
+        for child in reversed(node.get("Children", ())):
+            pending.append((child, nodeIndex))
+
+    return index
+
+def fromArrays(kindNames, names, kinds, parents, covered, total, percents) -> CoverageIndex:
+    '''Rebuilds an index from its stored arrays, as written by reportCache.'''
+    index = CoverageIndex()
+    for kind in kindNames:
+        index.kindCode(kind)
+    index.names = names
+    index.kinds = kinds
+    index.parents = parents
+    index.covered = covered
+    index.total = total
+    index.percents = percents
+    return index
+
+def fromTree(tree) -> CoverageIndex:
+    '''Flattens (depth, node) pairs as yielded by jsonStreamParser.readTree.'''
+    index = CoverageIndex()
+    parentByDepth = []
+
+    for depth, node in tree:
+        if node.get("Kind") in skippedKinds:
+            continue
+        parent = parentByDepth[depth - 1] if depth > 0 else -1
+        del parentByDepth[depth:]
+        parentByDepth.append(index.appendNode(node, parent))
+
+    return index
+
+def fromReport(filepath, streaming: bool = False) -> CoverageIndex:
+    '''Builds the index of a report file. The default parses the report with
+    the fastest JSON backend, streaming keeps memory bounded at the cost of
+    a slower pure Python tokenizer. XML reports are always streamed.'''
+    if xmlStreamParser.isXMLReport(filepath):
+        return fromTree(xmlStreamParser.iterTree(filepath))
+    if streaming:
+        return fromTree(jsonStreamParser.iterTree(filepath))
+    return fromJSONObject(jsonTextParser.createJSONObject(filepath))
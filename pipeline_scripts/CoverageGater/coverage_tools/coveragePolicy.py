@@ -0,0 +1,129 @@
+"""Per-node coverage targets and pass/fail overrides. A rule names a node
+exactly ("DDGShmooTC"), with a glob ("*Callbacks") or with a regex prefixed
+by "re:" ("re:^Prime\\..*UnitTest$"). Every rule set is compiled once into
+hash tables for exact names and literal prefix/suffix globs, plus one
+combined regex for the remaining patterns, so a lookup costs a few hash
+probes and at most one regex match however many rules are configured."""
+import fnmatch
+import functools
+import re
+from coverage_tools import getArguments
+
+regexPrefix = "re:"
+_missing = object()
+_globCharacters = re.compile(r'[*?\[]')
+
+invalidPolicyExceptionMessage = "Coverage policy rule could not be compiled."
+
+class InvalidPolicyException(Exception):
+    pass
+
+def isPattern(rule: str) -> bool:
+    return rule.startswith(regexPrefix) or _globCharacters.search(rule) is not None
+
+def _toRegex(rule: str) -> str:
+    if rule.startswith(regexPrefix):
+        return r'(?:{})\Z'.format(rule[len(regexPrefix):])
+    return fnmatch.translate(rule)
+
+class RuleSet:
+    '''Maps node names to the value of the first rule matching them. Exact
+    names win over patterns, patterns are tried in the order given.
+
+    Globs that are a literal prefix ("Pup*") or suffix ("*Callbacks") are
+    looked up by hash, one probe per distinct literal length. Only the other
+    patterns go through the combined regex, since Python's regex engine
+    still tries the alternatives of a regex one by one.'''
+
+    def __init__(self, rules):
+        self.exact = {}
+        self.values = []
+        self.prefixes = {} # literal length -> {prefix: rule index}
+        self.suffixes = {}
+        patterns = []
+        self._firstRegexRule = None
+
+        for rule, value in rules:
+            if not isPattern(rule):
+                self.exact.setdefault(rule, value)
+                continue
+
+            ruleIndex = len(self.values)
+            self.values.append(value)
+            if not rule.startswith(regexPrefix) and _globCharacters.search(rule[:-1]) is None and rule.endswith("*"):
+                self.prefixes.setdefault(len(rule) - 1, {}).setdefault(rule[:-1], ruleIndex)
+            elif not rule.startswith(regexPrefix) and _globCharacters.search(rule[1:]) is None and rule.startswith("*"):
+                self.suffixes.setdefault(len(rule) - 1, {}).setdefault(rule[1:], ruleIndex)
+            else:
+                try:
+                    re.compile(_toRegex(rule))
+                except re.error as ex:
+                    raise InvalidPolicyException(invalidPolicyExceptionMessage, rule, str(ex))
+                # one named group per rule, the alternation stops at the first rule matching
+                patterns.append("(?P<rule{}>{})".format(ruleIndex, _toRegex(rule)))
+                if self._firstRegexRule is None:
+                    self._firstRegexRule = ruleIndex
+
+        self.matcher = re.compile("|".join(patterns)) if patterns else None
+
+    def _firstRule(self, name: str):
+        firstRule = None
+        for length, table in self.prefixes.items():
+            ruleIndex = table.get(name[:length]) if length <= len(name) else None
+            if ruleIndex is not None and (firstRule is None or ruleIndex < firstRule):
+                firstRule = ruleIndex
+        for length, table in self.suffixes.items():
+            ruleIndex = table.get(name[len(name) - length:]) if length <= len(name) else None
+            if ruleIndex is not None and (firstRule is None or ruleIndex < firstRule):
+                firstRule = ruleIndex
+
+        # the regex can't find an earlier rule than one already found
+        if self.matcher is not None and (firstRule is None or self._firstRegexRule < firstRule):
+            match = self.matcher.match(name)
+            if match is not None:
+                ruleIndex = int(match.lastgroup[len("rule"):])
+                if firstRule is None or ruleIndex < firstRule:
+                    firstRule = ruleIndex
+        return firstRule
+
+    def lookup(self, name: str, default=None):
+        value = self.exact.get(name, _missing)
+        if value is not _missing:
+            return value
+        firstRule = self._firstRule(name)
+        return self.values[firstRule] if firstRule is not None else default
+
+    def __contains__(self, name: str) -> bool:
+        return self.lookup(name, _missing) is not _missing
+
+class CoveragePolicy:
+    '''Target and overrides of every node, built from the Targets,
+    PassOverride and FailOverride entries of the arguments.'''
+
+    def __init__(self, coverageTarget, targets=None, passOverride=None, failOverride=None):
+        self.coverageTarget = coverageTarget
+        self.targets = RuleSet((targets or {}).items())
+        self.passOverride = RuleSet((rule, True) for rule in passOverride or [])
+        self.failOverride = RuleSet((rule, True) for rule in failOverride or [])
+
+    def target(self, name: str):
+        return self.targets.lookup(name, self.coverageTarget)
+
+    def isPassOverride(self, name: str) -> bool:
+        return name in self.passOverride
+
+    def isFailOverride(self, name: str) -> bool:
+        return name in self.failOverride
+
+@functools.lru_cache(maxsize=16)
+def _createPolicy(coverageTarget, targets: tuple, passOverride: tuple, failOverride: tuple) -> CoveragePolicy:
+    return CoveragePolicy(coverageTarget, dict(targets), passOverride, failOverride)
+
+def createPolicy(scriptArgs: getArguments.Arguments) -> CoveragePolicy:
+    '''Policy of the arguments, compiled once per distinct set of rules (each
+    gating level and profile asks for it again).'''
+    return _createPolicy(
+        scriptArgs.coverageTarget,
+        tuple((scriptArgs.targets or {}).items()),
+        tuple(scriptArgs.passOverride or ()),
+        tuple(scriptArgs.failOverride or ()))
@@ -0,0 +1,92 @@
+"""Outcome of gating, node by node, kept as data so it can be written out by
+any of the emitters in resultEmitter.py instead of being printed as it is found."""
+from coverage_tools import getArguments
+
+passVerdict = "PASS"
+failVerdict = "FAIL"
+overriddenToPassVerdict = "OVERRIDE_PASS"
+overriddenToFailVerdict = "OVERRIDE_FAIL"
+failingVerdicts = (failVerdict, overriddenToFailVerdict)
+
+targetMode = "Target"
+regressionMode = "Regression"
+
+class NodeResult:
+    '''Verdict of one node. Regression results also hold the statements of
+    the node in the baseline and current report, and the coverage delta.'''
+    __slots__ = ("kind", "name", "coverage", "verdict", "target", "covered", "total", "baselineCovered", "baselineTotal", "delta")
+
+    def __init__(self, kind: str, name: str, coverage, verdict: str, target=None, covered=None, total=None,
+                 baselineCovered=None, baselineTotal=None, delta=None):
+        self.kind = kind
+        self.name = name
+        self.coverage = coverage
+        self.verdict = verdict
+        self.target = target # set when the node has its own target, see coveragePolicy
+        self.covered = covered
+        self.total = total
+        self.baselineCovered = baselineCovered
+        self.baselineTotal = baselineTotal
+        self.delta = delta
+
+    def isFailing(self) -> bool:
+        return self.verdict in failingVerdicts
+
+    def toDict(self) -> dict:
+        return {slot[0].upper() + slot[1:]: getattr(self, slot) for slot in self.__slots__ if getattr(self, slot) is not None}
+
+class GateResult:
+    '''Verdicts of one gating pass: one kind against the coverage target, or
+    the gating levels against a baseline report.'''
+
+    def __init__(self, mode: str, kind: str, coverageTarget, passOverride=None, failOverride=None,
+                 profileName=None, baselineReportPath=None, regressionTolerance=None):
+        self.mode = mode
+        self.kind = kind
+        self.coverageTarget = coverageTarget
+        self.passOverride = passOverride
+        self.failOverride = failOverride
+        self.profileName = profileName
+        self.baselineReportPath = baselineReportPath
+        self.regressionTolerance = regressionTolerance
+        self.informational = False
+        self.skippedNodes = 0 # regression only, nodes missing from the baseline
+        self.nodes = []
+
+    def add(self, kind: str, name: str, coverage, verdict: str, **statements) -> NodeResult:
+        node = NodeResult(kind, name, coverage, verdict, **statements)
+        self.nodes.append(node)
+        return node
+
+    def withVerdict(self, verdict: str) -> list:
+        return [node for node in self.nodes if node.verdict == verdict]
+
+    def failingNames(self) -> list:
+        '''Failing nodes first, then the ones overridden to fail, the order gater has always returned.'''
+        return ([node.name for node in self.withVerdict(failVerdict)] +
+                [node.name for node in self.withVerdict(overriddenToFailVerdict)])
+
+    def passed(self) -> bool:
+        return not any(node.isFailing() for node in self.nodes)
+
+    def toDict(self) -> dict:
+        resultDict = {
+            "Mode": self.mode,
+            "Kind": self.kind,
+            "CoverageTarget": self.coverageTarget,
+            "Verdict": passVerdict if self.passed() else failVerdict,
+            "Nodes": [node.toDict() for node in self.nodes]}
+        if self.profileName is not None:
+            resultDict["Profile"] = self.profileName
+            resultDict["Informational"] = self.informational
+        if self.mode == regressionMode:
+            resultDict["BaselineReport"] = self.baselineReportPath
+            resultDict["RegressionTolerance"] = self.regressionTolerance
+            resultDict["SkippedNodes"] = self.skippedNodes
+        return resultDict
+
+def createResult(mode: str, kind: str, scriptArgs: getArguments.Arguments) -> GateResult:
+    result = GateResult(mode, kind, scriptArgs.coverageTarget, scriptArgs.passOverride, scriptArgs.failOverride,
+                        scriptArgs.profileName, scriptArgs.baselineReportPath, scriptArgs.regressionTolerance)
+    result.informational = scriptArgs.informational
+    return result
@@ -1,51 +1,44 @@
 """Takes in objects representing all assemblies, determines which ones to gate"""
+from coverage_tools import coveragePolicy
+from coverage_tools import gateResult
 from coverage_tools import getArguments
 
-def determineGatingAssemblies(assembliesDict: dict, scriptArgs: getArguments.Arguments):
+def determineGatingAssemblies(assembliesDict: dict, scriptArgs: getArguments.Arguments, results: list = None):
     '''Determine if any assemblies do not meet the coverage requirement'''
 
-    print("Checking if assemblies meet requirement...\n")
-    gatingAssemblies = []
-    overriddenToPass = []
-    overriddenToFail = []
-
-    if scriptArgs.passOverride is not None:
-        print("Pass override assemblies detected, following assemblies will always pass...")
-        print(str(scriptArgs.passOverride))
-    else:
-        print("No pass overrides detected...")
-        scriptArgs.passOverride = []
-
-    if scriptArgs.failOverride is not None:
-        print("Fail override assemblies detected, following assemblies will always fail...")
-        print(str(scriptArgs.failOverride))
-    else:
-        print("No fail overrides detected...")
-        scriptArgs.failOverride = []
-
-    print()
-
-    for name, coverage in assembliesDict.items():
-        print("Assembly=[{}] Coverage=[{}] Target=[{}]".format(name, coverage, scriptArgs.coverageTarget))
-        if coverage < scriptArgs.coverageTarget:
-            if name in scriptArgs.passOverride:
-                overriddenToPass.append(name)
-            else:
-                gatingAssemblies.append(name)
+    return determineGatingNodes(assembliesDict, scriptArgs, "Assembly", results)
+
+def evaluateNodes(coverageDict: dict, scriptArgs: getArguments.Arguments, kind: str) -> gateResult.GateResult:
+    '''Verdict of every node of a kind (as returned by CoverageIndex.coverageDict)
+    against the coverage requirement'''
+
+    result = gateResult.createResult(gateResult.targetMode, kind, scriptArgs)
+    policy = coveragePolicy.createPolicy(scriptArgs)
+
+    for name, coverage in coverageDict.items():
+        target = policy.target(name)
+        if coverage < target:
+            verdict = gateResult.overriddenToPassVerdict if policy.isPassOverride(name) else gateResult.failVerdict
         else:
-            if name in scriptArgs.failOverride:
-                overriddenToFail.append(name)
+            verdict = gateResult.overriddenToFailVerdict if policy.isFailOverride(name) else gateResult.passVerdict
+        result.add(kind, name, coverage, verdict, target=target)
+
+    return result
 
-    for assembly in gatingAssemblies:
-        print('Assembly [{}] coverage value [{}] does not meet target.'.format(assembly, str(scriptArgs.coverageTarget)))
-    print()
+def determineGatingNodes(coverageDict: dict, scriptArgs: getArguments.Arguments, kind: str, results: list = None):
+    '''Determine if any nodes of a kind (as returned by CoverageIndex.coverageDict)
+    do not meet the coverage requirement. The result is added to `results`
+    when given, the emitters write them once the run is complete.'''
 
-    for assembly in overriddenToFail:
-        print('Assembly [{}] met coverage target [{}], but was overridden to fail.'.format(assembly, str(scriptArgs.coverageTarget)))
-    print()
+    result = evaluateNodes(coverageDict, scriptArgs, kind)
+    if results is not None:
+        results.append(result)
+    return result.failingNames()
 
-    for assembly in overriddenToPass:
-        print('Assembly [{}] did not meet the coverage target [{}], but was overridden to pass.'.format(assembly, str(scriptArgs.coverageTarget)))
-    print()
+def determineGatingIndex(index, scriptArgs: getArguments.Arguments, results: list = None):
+    '''Gates every kind listed in scriptArgs.gatingLevels against a flattened report (coverageIndex.CoverageIndex)'''
 
-    return gatingAssemblies + overriddenToFail
\ No newline at end of file
+    gatingNodes = []
+    for kind in scriptArgs.gatingLevels:
+        gatingNodes += determineGatingNodes(index.coverageDict(kind), scriptArgs, kind, results)
+    return gatingNodes
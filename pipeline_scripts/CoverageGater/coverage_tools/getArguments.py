@@ -1,38 +1,99 @@
 """Responsible for reading arguments and detecting if they're valid"""
 
+import os
 import sys
+import copy
 import getopt
 from coverage_tools import jsonTextParser
 
 argumentNumberExceptionMessage = "No arguments given. Make sure they are formatted correctly or that they exist."
 argumentEmptyExceptionMessage = "One or both arguments found to be empty when executing."
+gatingLevelChoices = ("Assembly", "Namespace", "Type", "Method")
+invalidGatingLevelExceptionMessage = "Gating level must be one of: " + ", ".join(gatingLevelChoices)
+invalidProfileExceptionMessage = "Every entry of Profiles in the configuration file needs a unique Name."
+invalidWatchExceptionMessage = "Watch mode only gates the reports, it can't be combined with changed files, profiles, history or result files."
 
 class ArgumentsEmptyException(Exception):
     pass
 
+class InvalidGatingLevelException(Exception):
+    pass
+
+class InvalidProfileException(Exception):
+    pass
+
+class InvalidWatchException(Exception):
+    pass
+
 class Arguments:
-    def __init__(self, coverageReportPath, coverageTarget, passOverride, failOverride):
+    def __init__(self, coverageReportPath, coverageTarget, passOverride, failOverride, gatingLevels=None,
+                 baselineReportPath=None, regressionTolerance=0, useCache=False, cacheDirectory=None,
+                 hotspotCount=10, changedFilesPath=None, assemblyMapPath=None, sourceDirectory="src",
+                 jsonResultPath=None, junitResultPath=None, historyPath=None, commitId=None,
+                 watchInterval=None, targets=None):
         self.coverageReportPath = coverageReportPath
         self.coverageTarget = coverageTarget
         self.passOverride = passOverride
         self.failOverride = failOverride
+        self.gatingLevels = gatingLevels if gatingLevels is not None else ["Assembly"]
+        self.baselineReportPath = baselineReportPath
+        self.regressionTolerance = regressionTolerance
+        self.useCache = useCache
+        self.cacheDirectory = cacheDirectory
+        self.hotspotCount = hotspotCount
+        self.changedFilesPath = changedFilesPath # only gate the assemblies built from these files
+        self.assemblyMapPath = assemblyMapPath
+        self.sourceDirectory = sourceDirectory
+        self.jsonResultPath = jsonResultPath
+        self.junitResultPath = junitResultPath
+        self.historyPath = historyPath
+        self.commitId = commitId
+        self.watchInterval = watchInterval # seconds between polls in watch mode, None when not watching
+        self.targets = targets # {name or pattern: target}, see coveragePolicy
+        self.profileName = None
+        self.informational = False # profile is reported but never fails the run
+        self.profiles = []
+
+    def reportPaths(self) -> list:
+        '''coverageReportPath holds a single path, or a list when several reports are merged'''
+        if isinstance(self.coverageReportPath, str):
+            return [self.coverageReportPath]
+        return list(self.coverageReportPath)
 
 def getArguments() -> Arguments:
     """Same functionality as base version, but allows for the use of
     a JSON configuration file for passing in all arguments."""
 
     coverageJSONPath = ''
+    commandLineReports = []
     coverageTarget = -1
     passOverride = None
     failOverride = None
+    gatingLevels = None
+    baselineReportPath = None
+    regressionTolerance = 0
+    useCache = None # opt-in, giving a cache directory turns it on
+    cacheDirectory = None
+    hotspotCount = 10
+    changedFilesPath = None
+    assemblyMapPath = None
+    sourceDirectory = "src"
+    jsonResultPath = None
+    junitResultPath = None
+    historyPath = None
+    commitId = os.environ.get("GITHUB_SHA")
+    watch = False
+    watchInterval = 0.25
+    targets = None
+    profileConfigs = []
 
     argumentList = sys.argv[1:]
 
     if len(argumentList) < 1:
         raise ArgumentsEmptyException(argumentNumberExceptionMessage, sys.argv)
 
-    options = "r:t:c:h"
-    long_options = ["Report =", "Target =", "Config =", "Help"]
+    options = "r:t:c:l:b:h"
+    long_options = ["Report =", "Target =", "Config =", "Level =", "Baseline =", "Tolerance =", "UseCache", "CacheDirectory =", "NoCache", "Hotspots =", "Changed =", "AssemblyMap =", "SourceRoot =", "JSONResult =", "JUnitResult =", "History =", "Commit =", "Watch", "WatchInterval =", "Help"]
     arguments, values = getopt.getopt(argumentList, options, long_options)
 
     for arg, currentVal in arguments:
@@ -40,9 +101,41 @@ def getArguments() -> Arguments:
         if currentArg == "-h" or currentArg == "--Help":
             print("Displaying help...")
         elif currentArg == "-r" or currentArg == "--Report":
-            coverageJSONPath = currentVal
+            commandLineReports.append(currentVal)
         elif currentArg == "-t" or currentArg == "--Target":
             coverageTarget = float(currentVal)
+        elif currentArg == "-l" or currentArg == "--Level":
+            gatingLevels = currentVal
+        elif currentArg == "-b" or currentArg == "--Baseline":
+            baselineReportPath = currentVal
+        elif currentArg == "--Tolerance":
+            regressionTolerance = float(currentVal)
+        elif currentArg == "--UseCache":
+            useCache = True
+        elif currentArg == "--CacheDirectory":
+            cacheDirectory = currentVal
+        elif currentArg == "--NoCache":
+            useCache = False
+        elif currentArg == "--Hotspots":
+            hotspotCount = int(currentVal)
+        elif currentArg == "--Changed":
+            changedFilesPath = currentVal
+        elif currentArg == "--AssemblyMap":
+            assemblyMapPath = currentVal
+        elif currentArg == "--SourceRoot":
+            sourceDirectory = currentVal
+        elif currentArg == "--JSONResult":
+            jsonResultPath = currentVal
+        elif currentArg == "--JUnitResult":
+            junitResultPath = currentVal
+        elif currentArg == "--History":
+            historyPath = currentVal
+        elif currentArg == "--Commit":
+            commitId = currentVal
+        elif currentArg == "--Watch":
+            watch = True
+        elif currentArg == "--WatchInterval":
+            watchInterval = float(currentVal)
         elif currentArg == "-c" or  currentArg == "--Config":
             configObj = parseConfigFile(currentVal)
             if "CoverageReport" in configObj.keys():
@@ -53,6 +146,42 @@ def getArguments() -> Arguments:
                 passOverride = configObj["PassOverride"]
             if "FailOverride" in configObj.keys():
                 failOverride = configObj["FailOverride"]
+            if "Targets" in configObj.keys():
+                targets = configObj["Targets"]
+            if "GatingLevel" in configObj.keys():
+                gatingLevels = configObj["GatingLevel"]
+            if "BaselineReport" in configObj.keys():
+                baselineReportPath = configObj["BaselineReport"]
+            if "RegressionTolerance" in configObj.keys():
+                regressionTolerance = configObj["RegressionTolerance"]
+            if "UseCache" in configObj.keys():
+                useCache = configObj["UseCache"]
+            if "CacheDirectory" in configObj.keys():
+                cacheDirectory = configObj["CacheDirectory"]
+            if "HotspotCount" in configObj.keys():
+                hotspotCount = configObj["HotspotCount"]
+            if "ChangedFiles" in configObj.keys():
+                changedFilesPath = configObj["ChangedFiles"]
+            if "AssemblyMap" in configObj.keys():
+                assemblyMapPath = configObj["AssemblyMap"]
+            if "SourceRoot" in configObj.keys():
+                sourceDirectory = configObj["SourceRoot"]
+            if "JSONResult" in configObj.keys():
+                jsonResultPath = configObj["JSONResult"]
+            if "JUnitResult" in configObj.keys():
+                junitResultPath = configObj["JUnitResult"]
+            if "HistoryDatabase" in configObj.keys():
+                historyPath = configObj["HistoryDatabase"]
+            if "WatchInterval" in configObj.keys():
+                watchInterval = configObj["WatchInterval"]
+            if "Profiles" in configObj.keys():
+                profileConfigs = configObj["Profiles"]
+
+    # --Report can be repeated to merge several reports, and wins over the config file
+    if len(commandLineReports) == 1:
+        coverageJSONPath = commandLineReports[0]
+    elif len(commandLineReports) > 1:
+        coverageJSONPath = commandLineReports
 
     argumentsNotEmpty = bool(coverageJSONPath) and coverageTarget is not None
     argumentReporter = ''
@@ -64,7 +193,74 @@ def getArguments() -> Arguments:
     if(not argumentsNotEmpty):
         raise ArgumentsEmptyException(argumentEmptyExceptionMessage, sys.argv)
 
-    return Arguments(coverageJSONPath, coverageTarget, passOverride, failOverride)
+    if gatingLevels is not None:
+        gatingLevels = validateGatingLevels(gatingLevels)
+
+    if useCache is None:
+        useCache = cacheDirectory is not None
+
+    if watch:
+        validateWatchArguments(changedFilesPath, profileConfigs, historyPath, jsonResultPath, junitResultPath)
+
+    scriptArgs = Arguments(coverageJSONPath, coverageTarget, passOverride, failOverride, gatingLevels,
+                           baselineReportPath, regressionTolerance, useCache, cacheDirectory,
+                           hotspotCount, changedFilesPath, assemblyMapPath, sourceDirectory,
+                           jsonResultPath, junitResultPath, historyPath, commitId,
+                           watchInterval if watch else None, targets)
+
+    profileNames = set()
+    for profileConfig in profileConfigs:
+        profile = createProfile(scriptArgs, profileConfig)
+        if profile.profileName in profileNames:
+            raise InvalidProfileException(invalidProfileExceptionMessage, profile.profileName)
+        profileNames.add(profile.profileName)
+        scriptArgs.profiles.append(profile)
+
+    return scriptArgs
+
+def validateGatingLevels(gatingLevels) -> list:
+    if isinstance(gatingLevels, str):
+        gatingLevels = gatingLevels.split(",")
+    gatingLevels = [level.strip() for level in gatingLevels]
+    if not gatingLevels or any(level not in gatingLevelChoices for level in gatingLevels):
+        raise InvalidGatingLevelException(invalidGatingLevelExceptionMessage, gatingLevels)
+    return gatingLevels
+
+def validateWatchArguments(changedFilesPath, profileConfigs, historyPath, jsonResultPath, junitResultPath):
+    unsupported = {
+        "ChangedFiles": changedFilesPath, "Profiles": profileConfigs, "HistoryDatabase": historyPath,
+        "JSONResult": jsonResultPath, "JUnitResult": junitResultPath}
+    unsupported = [name for name, value in unsupported.items() if value]
+    if unsupported:
+        raise InvalidWatchException(invalidWatchExceptionMessage, unsupported)
+
+def createProfile(scriptArgs: Arguments, profileConfig: dict) -> Arguments:
+    """Creates the arguments of one gate profile (an entry of "Profiles" in
+    the configuration file). Keys left out of the profile keep the values
+    of the top level arguments."""
+    if not profileConfig.get("Name"):
+        raise InvalidProfileException(invalidProfileExceptionMessage, profileConfig)
+
+    profile = copy.copy(scriptArgs)
+    profile.profiles = []
+    profile.profileName = profileConfig["Name"]
+    if "CoverageTarget" in profileConfig.keys():
+        profile.coverageTarget = profileConfig["CoverageTarget"]
+    if "PassOverride" in profileConfig.keys():
+        profile.passOverride = profileConfig["PassOverride"]
+    if "FailOverride" in profileConfig.keys():
+        profile.failOverride = profileConfig["FailOverride"]
+    if "Targets" in profileConfig.keys():
+        profile.targets = profileConfig["Targets"]
+    if "GatingLevel" in profileConfig.keys():
+        profile.gatingLevels = validateGatingLevels(profileConfig["GatingLevel"])
+    if "BaselineReport" in profileConfig.keys():
+        profile.baselineReportPath = profileConfig["BaselineReport"]
+    if "RegressionTolerance" in profileConfig.keys():
+        profile.regressionTolerance = profileConfig["RegressionTolerance"]
+    if "Informational" in profileConfig.keys():
+        profile.informational = profileConfig["Informational"]
+    return profile
 
 def parseConfigFile(configPath) -> dict:
     return jsonTextParser.createJSONObject(configPath)
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""Finds the types and methods with the most uncovered statements, so a failing
+gate points at what to test next without opening the HTML report. Only a
+bounded heap of K entries is kept per kind and scope, O(n log K) overall."""
+import heapq
+
+hotspotKinds = ("Type", "Method")
+
+def indexRecords(reportIndex, scopes=()):
+    '''Yields (qualifiedName, kind, uncovered, total, scope) for every node of a
+    coverageIndex.CoverageIndex. scope is the closest ancestor (or the node
+    itself) whose qualified name is in `scopes`, None otherwise.'''
+    scopes = set(scopes)
+    qualifiedNames = reportIndex.qualifiedNames()
+    scopeOf = []
+
+    for i, parent in enumerate(reportIndex.parents):
+        name = qualifiedNames[i]
+        scope = name if name in scopes else (scopeOf[parent] if parent >= 0 else None)
+        scopeOf.append(scope)
+        total = reportIndex.total[i]
+        yield (name, reportIndex.kindNames[reportIndex.kinds[i]], total - reportIndex.covered[i], total, scope)
+
+def treeRecords(tree, scopes=()):
+    '''Same as indexRecords, for the (depth, node) pairs of jsonStreamParser.readTree.'''
+    scopes = set(scopes)
+    nameByDepth = []
+    scopeByDepth = []
+
+    for depth, node in tree:
+        del nameByDepth[depth:]
+        del scopeByDepth[depth:]
+        parentName = nameByDepth[-1] if nameByDepth else ''
+        name = node.get("Name", "")
+        if parentName:
+            name = parentName + "." + name
+        scope = name if name in scopes else (scopeByDepth[-1] if scopeByDepth else None)
+        nameByDepth.append(name)
+        scopeByDepth.append(scope)
+
+        total = node.get("TotalStatements", 0)
+        yield (name, node.get("Kind", ""), total - node.get("CoveredStatements", 0), total, scope)
+
+def _push(heap, count, entry):
+    if len(heap) < count:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+def findHotspots(records, count: int, kinds=hotspotKinds) -> dict:
+    '''Returns {scope: {kind: [(uncovered, total, qualifiedName), ...]}} sorted
+    by most uncovered first. Scope None holds the hotspots of the whole report.'''
+    heaps = {None: {kind: [] for kind in kinds}}
+
+    for name, kind, uncovered, total, scope in records:
+        if uncovered <= 0 or kind not in kinds:
+            continue
+        entry = (uncovered, total, name)
+        _push(heaps[None][kind], count, entry)
+        if scope is not None:
+            if scope not in heaps:
+                heaps[scope] = {kind: [] for kind in kinds}
+            _push(heaps[scope][kind], count, entry)
+
+    return {scope: {kind: sorted(heap, reverse=True) for kind, heap in kindHeaps.items()}
+            for scope, kindHeaps in heaps.items()}
+
+def printHotspots(hotspots: dict):
+    for scope, kindHotspots in hotspots.items():
+        for kind, entries in kindHotspots.items():
+            if not entries:
+                continue
+            print("Top {} {} nodes by uncovered statements in [{}]:".format(
+                len(entries), kind, scope if scope is not None else "all assemblies"))
+            for uncovered, total, name in entries:
+                print("    Uncovered=[{}/{}] {}=[{}]".format(uncovered, total, kind, name))
+            print()
@@ -0,0 +1,82 @@
+"""Registry of JSON decoders. The fastest installed decoder is used for every
+report and config file, the stdlib json module is always registered so there
+is always something to fall back to."""
+import json
+import os
+
+backendEnvironmentVariable = "COVERAGE_JSON_BACKEND"
+
+unknownBackendExceptionMessage = "Requested JSON backend is not registered or not installed."
+
+class UnknownBackendException(Exception):
+    pass
+
+class Backend:
+    def __init__(self, name, loads, acceptsBuffer):
+        self.name = name
+        self.acceptsBuffer = acceptsBuffer # True if loads() takes bytes/memoryview of utf-8 text directly
+        self._loads = loads
+
+    def loads(self, data):
+        if isinstance(data, str) or self.acceptsBuffer:
+            return self._loads(data)
+        return self._loads(str(data, 'utf-8'))
+
+_backends = {}
+_activeBackend = None
+
+def registerBackend(name, loads, acceptsBuffer: bool = False):
+    '''Registers a decoder. Backends are preferred in registration order.'''
+    _backends[name] = Backend(name, loads, acceptsBuffer)
+
+def availableBackends() -> list:
+    return list(_backends.keys())
+
+def getBackend(name=None) -> Backend:
+    '''Returns the named backend, or the active one if no name is given.'''
+    if name is None:
+        return _activeBackend
+    if name not in _backends:
+        raise UnknownBackendException(unknownBackendExceptionMessage, name)
+    return _backends[name]
+
+def setBackend(name=None):
+    '''Makes the named backend active. Without a name, the backend from the
+    COVERAGE_JSON_BACKEND environment variable or the preferred installed
+    one is used.'''
+    global _activeBackend
+
+    if name is None:
+        name = os.environ.get(backendEnvironmentVariable)
+    if name is None:
+        name = availableBackends()[0]
+    _activeBackend = getBackend(name)
+
+def loads(data):
+    '''Decodes a str, bytes or memoryview holding JSON text with the active backend.'''
+    return _activeBackend.loads(data)
+
+def _registerInstalledBackends():
+    # ordered by speed on dotCover reports, see jsonBackendBenchmark.py
+    try:
+        import orjson
+        registerBackend("orjson", orjson.loads, acceptsBuffer=True)
+    except ImportError:
+        pass
+
+    try:
+        import rapidjson
+        registerBackend("rapidjson", rapidjson.loads)
+    except ImportError:
+        pass
+
+    try:
+        import ujson
+        registerBackend("ujson", ujson.loads)
+    except ImportError:
+        pass
+
+    registerBackend("json", json.loads)
+
+_registerInstalledBackends()
+setBackend()
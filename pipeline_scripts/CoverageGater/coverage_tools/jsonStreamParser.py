@@ -0,0 +1,227 @@
+"""Incrementally reads dotCover JSON reports without building the whole tree.
+Only the nodes at the requested depth are materialized, every subtree below
+them is skipped by bracket counting, so memory stays constant regardless of
+the size of the report."""
+import json
+import re
+
+readChunkSize = 1 << 20
+
+invalidJSONExceptionMessage = """Coverage report is not valid JSON or ended
+before the report tree was closed."""
+
+class InvalidJSONException(Exception):
+    pass
+
+# One token: a bracket, a string (group 2 holds the raw contents) or a literal.
+# Commas and colons carry no information for well-formed reports, so they are
+# consumed together with the whitespace.
+_tokenPattern = re.compile(r'[\s,:]*(?:([\[\]{}])|"([^"\\]*(?:\\.[^"\\]*)*)"|([^\s,:\[\]{}"]+))', re.S)
+
+# Everything up to the next bracket that is not inside a string.
+_skipPattern = re.compile(r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])', re.S)
+
+_whitespacePattern = re.compile(r'[\s,:]*\Z')
+
+_literals = {"true": True, "false": False, "null": None}
+
+class _Tokenizer:
+    """Pulls tokens out of a text reader one chunk at a time."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _refill(self):
+        chunk = self.reader.read(readChunkSize)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skipPrefix(self):
+        """dotCover writes a few garbage characters before the opening brace,
+        same problem jsonTextParser.correctJSONText works around."""
+        while True:
+            index = self.buffer.find('{', self.pos)
+            if index >= 0:
+                self.pos = index
+                return
+            self.pos = len(self.buffer)
+            if not self._refill():
+                raise InvalidJSONException(invalidJSONExceptionMessage)
+
+    def nextToken(self):
+        '''Returns (bracket, None), ('"', string) or ('', literal), or None at the end of the input.'''
+        while True:
+            match = _tokenPattern.match(self.buffer, self.pos)
+            if match is None or (match.end() == len(self.buffer) and not self.eof):
+                # token may continue in the next chunk
+                if not self.eof and self._refill():
+                    continue
+                if match is None:
+                    if _whitespacePattern.match(self.buffer, self.pos):
+                        return None
+                    raise InvalidJSONException(invalidJSONExceptionMessage)
+
+            self.pos = match.end()
+            bracket, string, literal = match.groups()
+            if bracket is not None:
+                return (bracket, None)
+            if string is not None:
+                if '\\' in string:
+                    string = json.loads('"' + string + '"')
+                return ('"', string)
+            if literal in _literals:
+                return ('', _literals[literal])
+            try:
+                return ('', int(literal))
+            except ValueError:
+                try:
+                    return ('', float(literal))
+                except ValueError:
+                    raise InvalidJSONException(invalidJSONExceptionMessage)
+
+    def skipContainer(self):
+        """Skips past the closing bracket of the object/array that was just opened."""
+        depth = 1
+        while True:
+            match = _skipPattern.match(self.buffer, self.pos)
+            if match is None or (match.end() == len(self.buffer) and not self.eof):
+                if not self.eof and self._refill():
+                    continue
+                if match is None:
+                    raise InvalidJSONException(invalidJSONExceptionMessage)
+
+            self.pos = match.end()
+            if match.group(1) in '[{':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def expect(self, bracket):
+        token = self.nextToken()
+        if token is None or token[0] != bracket:
+            raise InvalidJSONException(invalidJSONExceptionMessage)
+
+def _readNode(tokenizer: _Tokenizer, nodeDepth: int, targetDepth: int):
+    '''Reads the node whose opening brace was just consumed.'''
+
+    node = {} if nodeDepth == targetDepth else None
+
+    while True:
+        token = tokenizer.nextToken()
+        if token is None:
+            raise InvalidJSONException(invalidJSONExceptionMessage)
+        if token[0] == '}':
+            break
+        if token[0] != '"':
+            raise InvalidJSONException(invalidJSONExceptionMessage)
+        key = token[1]
+
+        value = tokenizer.nextToken()
+        if value is None:
+            raise InvalidJSONException(invalidJSONExceptionMessage)
+
+        if key == "Children" and value[0] == '[' and nodeDepth < targetDepth:
+            while True:
+                child = tokenizer.nextToken()
+                if child is None:
+                    raise InvalidJSONException(invalidJSONExceptionMessage)
+                if child[0] == ']':
+                    break
+                if child[0] == '{':
+                    yield from _readNode(tokenizer, nodeDepth + 1, targetDepth)
+                elif child[0] == '[':
+                    tokenizer.skipContainer()
+        elif value[0] == '[' or value[0] == '{':
+            tokenizer.skipContainer()
+        elif value[0] == ']' or value[0] == '}':
+            raise InvalidJSONException(invalidJSONExceptionMessage)
+        elif node is not None:
+            node[key] = value[1]
+
+    if node is not None:
+        yield node
+
+def _readTreeNode(tokenizer: _Tokenizer, nodeDepth: int):
+    '''Reads the node whose opening brace was just consumed, and all of its children.'''
+
+    node = {}
+    isYielded = False
+
+    while True:
+        token = tokenizer.nextToken()
+        if token is None:
+            raise InvalidJSONException(invalidJSONExceptionMessage)
+        if token[0] == '}':
+            break
+        if token[0] != '"':
+            raise InvalidJSONException(invalidJSONExceptionMessage)
+        key = token[1]
+
+        value = tokenizer.nextToken()
+        if value is None:
+            raise InvalidJSONException(invalidJSONExceptionMessage)
+
+        if key == "Children" and value[0] == '[':
+            # dotCover writes "Children" last, the node is complete at this point
+            yield (nodeDepth, node)
+            isYielded = True
+            while True:
+                child = tokenizer.nextToken()
+                if child is None:
+                    raise InvalidJSONException(invalidJSONExceptionMessage)
+                if child[0] == ']':
+                    break
+                if child[0] == '{':
+                    yield from _readTreeNode(tokenizer, nodeDepth + 1)
+                elif child[0] == '[':
+                    tokenizer.skipContainer()
+        elif value[0] == '[' or value[0] == '{':
+            tokenizer.skipContainer()
+        elif value[0] == ']' or value[0] == '}':
+            raise InvalidJSONException(invalidJSONExceptionMessage)
+        else:
+            node[key] = value[1]
+
+    if not isYielded:
+        yield (nodeDepth, node)
+
+def readTree(reader):
+    '''Yields (depth, node) for every node of the report in pre-order, so
+    a node always comes before its children. Nodes hold their scalar fields
+    only, fields written after "Children" are not picked up.'''
+
+    tokenizer = _Tokenizer(reader)
+    tokenizer.skipPrefix()
+    tokenizer.expect('{')
+    yield from _readTreeNode(tokenizer, 0)
+
+def readNodes(reader, depth: int = 1):
+    '''Yields the nodes found `depth` levels below the root of the report
+    read from `reader` (Root=0, Assembly=1, Namespace=2, Type=3, ...).
+    Yielded nodes hold their scalar fields only, "Children" is never read.'''
+
+    tokenizer = _Tokenizer(reader)
+    tokenizer.skipPrefix()
+    tokenizer.expect('{')
+    yield from _readNode(tokenizer, 0, depth)
+
+def iterNodes(filepath, depth: int = 1):
+    '''Same as readNodes, but opens the report at `filepath`.'''
+
+    with open(filepath, 'r', encoding='utf-8-sig', errors='replace') as reader:
+        yield from readNodes(reader, depth)
+
+def iterTree(filepath):
+    '''Same as readTree, but opens the report at `filepath`.'''
+
+    with open(filepath, 'r', encoding='utf-8-sig', errors='replace') as reader:
+        yield from readTree(reader)
@@ -1,24 +1,76 @@
 """Module handling the parsing of JSON text"""
-import json
+import codecs
+import mmap
+import os
+from coverage_tools import jsonBackend
+
+_byteOrderMarks = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'))
 
 def correctJSONText(jsonText: str):
-    """Peforms some post processing of text. For some reason, dotCover 
+    """Peforms some post processing of text. For some reason, dotCover
     adds these weird latin symbols to the start of their file that
-    needs to be removed, if they're left in, they'll cause the 
+    needs to be removed, if they're left in, they'll cause the
     conversion to JSON object to fail."""
-    maxIndex = len(jsonText) - 1
-    i = 0
+    startIndex = jsonText.find('{')
+    if startIndex < 0:
+        return None
+    return jsonText[startIndex:]
+
+def sniffJSONStart(buffer) -> tuple:
+    """Byte level version of correctJSONText. Returns the offset of the
+    first '{' in a raw report buffer (bytes or mmap) and the encoding
+    given away by its byte order mark, or (None, encoding) if there is
+    no opening brace."""
+    encoding = 'utf-8'
+    start = 0
+    for bom, bomEncoding in _byteOrderMarks:
+        if buffer[:len(bom)] == bom:
+            encoding = bomEncoding
+            start = len(bom)
+            break
+
+    brace = '{'.encode(encoding)
+    index = buffer.find(brace, start)
+    # utf-16 code units are two bytes wide, a match must sit on a unit boundary
+    while index >= 0 and (index - start) % len(brace) != 0:
+        index = buffer.find(brace, index + 1)
+
+    if index < 0:
+        return (None, encoding)
+    return (index, encoding)
+
+def createMappedJSONObject(filepath):
+    """Memory maps the report instead of reading it into a string. The
+    garbage prefix is found on the raw bytes and the decoder is handed a
+    view of the mapped buffer, so no full-size copy of the file is made
+    before decoding. Backends that only take str get one decoded copy."""
+    with open(filepath, 'rb') as reader:
+        if os.fstat(reader.fileno()).st_size == 0:
+            return jsonBackend.loads('')
 
-    while i < maxIndex:
-        if jsonText[i] == '{':
-            return jsonText[i:maxIndex+1]
-        i += 1
+        with mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            startIndex, encoding = sniffJSONStart(buffer)
+            if startIndex is None:
+                return jsonBackend.loads('')
+
+            with memoryview(buffer) as view, view[startIndex:] as jsonView:
+                if encoding == 'utf-8' and jsonBackend.getBackend().acceptsBuffer:
+                    return jsonBackend.loads(jsonView)
+                jsonText = str(jsonView, encoding, 'replace')
+
+    return jsonBackend.loads(jsonText)
+
+def createJSONObject(filepath, memoryMapped: bool = True):
+    if memoryMapped:
+        return createMappedJSONObject(filepath)
 
-def createJSONObject(filepath):
     jsonText = ''
     with open(filepath, 'r') as reader:
         jsonText = reader.read()
-    
+
     correctedText = correctJSONText(jsonText)
-    jsonObject = json.loads(correctedText)
-    return jsonObject
\ No newline at end of file
+    jsonObject = jsonBackend.loads(correctedText)
+    return jsonObject
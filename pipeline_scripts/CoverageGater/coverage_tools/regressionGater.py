@@ -0,0 +1,69 @@
+"""Compares a coverage report against a baseline report (e.g. the last release)
+and determines which nodes regressed, instead of gating on an absolute target."""
+from coverage_tools import coveragePolicy
+from coverage_tools import gateResult
+from coverage_tools import getArguments
+
+def ratio(covered: int, total: int) -> float:
+    return covered * 100.0 / total if total else 100.0
+
+def joinIndices(baselineIndex, currentIndex, kinds) -> list:
+    '''Matches the nodes of two coverageIndex.CoverageIndex objects by kind and
+    fully qualified name. Returns (name, kind, baselineNode, currentNode) for
+    every node of the given kinds in the current report, baselineNode is None
+    for nodes that are new. One pass over each index, joined through a dict.'''
+
+    baselineKinds = set(baselineIndex.lookupKind(kind) for kind in kinds)
+    baselineNames = baselineIndex.qualifiedNames()
+    baselineLookup = {}
+    for i, kindCode in enumerate(baselineIndex.kinds):
+        if kindCode in baselineKinds:
+            baselineLookup[(baselineIndex.kindNames[kindCode], baselineNames[i])] = i
+
+    currentKinds = set(currentIndex.lookupKind(kind) for kind in kinds)
+    currentNames = currentIndex.qualifiedNames()
+    joinedNodes = []
+    for i, kindCode in enumerate(currentIndex.kinds):
+        if kindCode in currentKinds:
+            kind = currentIndex.kindNames[kindCode]
+            joinedNodes.append((currentNames[i], kind, baselineLookup.get((kind, currentNames[i])), i))
+
+    return joinedNodes
+
+def evaluateRegressions(baselineIndex, currentIndex, scriptArgs: getArguments.Arguments) -> gateResult.GateResult:
+    '''Verdict of every node of the gating levels found in both reports, a
+    node fails when it lost more coverage than the regression tolerance'''
+
+    result = gateResult.createResult(gateResult.regressionMode, ",".join(scriptArgs.gatingLevels), scriptArgs)
+    policy = coveragePolicy.createPolicy(scriptArgs)
+
+    for name, kind, baselineNode, currentNode in joinIndices(baselineIndex, currentIndex, scriptArgs.gatingLevels):
+        if baselineNode is None:
+            result.skippedNodes += 1
+            continue
+
+        baselineCovered = baselineIndex.covered[baselineNode]
+        baselineTotal = baselineIndex.total[baselineNode]
+        currentCovered = currentIndex.covered[currentNode]
+        currentTotal = currentIndex.total[currentNode]
+        delta = ratio(currentCovered, currentTotal) - ratio(baselineCovered, baselineTotal)
+
+        if delta < -scriptArgs.regressionTolerance:
+            verdict = gateResult.overriddenToPassVerdict if policy.isPassOverride(name) else gateResult.failVerdict
+        else:
+            verdict = gateResult.overriddenToFailVerdict if policy.isFailOverride(name) else gateResult.passVerdict
+        result.add(kind, name, ratio(currentCovered, currentTotal), verdict,
+                   covered=currentCovered, total=currentTotal,
+                   baselineCovered=baselineCovered, baselineTotal=baselineTotal, delta=delta)
+
+    return result
+
+def determineRegressions(baselineIndex, currentIndex, scriptArgs: getArguments.Arguments, results: list = None) -> list:
+    '''Determine which nodes of the gating levels lost more coverage than the
+    regression tolerance (in percentage points) versus the baseline. The
+    result is added to `results` when given, for the emitters.'''
+
+    result = evaluateRegressions(baselineIndex, currentIndex, scriptArgs)
+    if results is not None:
+        results.append(result)
+    return result.failingNames()
@@ -0,0 +1,131 @@
+"""Opt-in on-disk cache of flattened coverage reports. The gater is run several
+times against the same report with different configs, so the parsed index is
+stored in a cache directory outside of the published report folder and reused
+as long as the report content is unchanged. The index is stored as a JSON
+header followed by the raw bytes of its arrays, nothing in it is executed."""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from array import array
+from coverage_tools import coverageIndex
+
+cacheFormatVersion = 2
+cacheExtension = ".gatercache"
+hashChunkSize = 1 << 20
+defaultCacheDirectory = os.path.join(tempfile.gettempdir(), "coverageGaterCache")
+arrayFields = ("kinds", "parents", "covered", "total", "percents")
+
+def hashFile(filepath) -> str:
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as reader:
+        for chunk in iter(lambda: reader.read(hashChunkSize), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cachePathFor(reportPath, cacheDirectory=None) -> str:
+    '''Cache file of a report, in the default cache directory unless one is given.'''
+    if cacheDirectory is None:
+        cacheDirectory = defaultCacheDirectory
+
+    # reports from different folders share names (coverLogComplete.json)
+    pathDigest = hashlib.sha1(os.path.abspath(reportPath).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cacheDirectory, "{}.{}{}".format(os.path.basename(reportPath), pathDigest, cacheExtension))
+
+def _arrayLayout(reportIndex) -> dict:
+    # array item sizes differ between platforms ('l' is 4 bytes on Windows)
+    return {field: [getattr(reportIndex, field).typecode, getattr(reportIndex, field).itemsize] for field in arrayFields}
+
+def _readHeader(reader):
+    header = json.loads(reader.readline())
+    if not isinstance(header, dict) or header.get("version") != cacheFormatVersion or header.get("byteorder") != sys.byteorder:
+        return None
+    return header
+
+def _readIndex(reader, header) -> coverageIndex.CoverageIndex:
+    names = json.loads(reader.readline())
+    arrays = {}
+    for field in arrayFields:
+        typecode, itemsize = header["layout"][field]
+        values = array(typecode)
+        if values.itemsize != itemsize:
+            return None
+        values.fromfile(reader, header["count"])
+        arrays[field] = values
+    return coverageIndex.fromArrays(header["kindNames"], names, **arrays)
+
+def loadCachedIndex(reportPath, cachePath):
+    '''Returns the cached index of the report, or None on a cache miss. A
+    matching size and mtime is trusted, a changed mtime falls back to
+    comparing the content hash.'''
+    if not os.path.exists(cachePath):
+        return None
+
+    reportStat = os.stat(reportPath)
+    try:
+        with open(cachePath, 'rb') as reader:
+            header = _readHeader(reader)
+            if header is None or header["size"] != reportStat.st_size:
+                return None
+
+            isContentChanged = False
+            if header["mtime"] != reportStat.st_mtime_ns:
+                isContentChanged = (header["hash"] != hashFile(reportPath))
+            if isContentChanged:
+                return None
+
+            reportIndex = _readIndex(reader, header)
+    except (OSError, EOFError, ValueError, KeyError, TypeError):
+        return None # unreadable or outdated cache is just a miss
+    if reportIndex is None:
+        return None
+
+    if header["mtime"] != reportStat.st_mtime_ns:
+        # same content, refresh the mtime so the next run skips the hash
+        saveCachedIndex(reportIndex, reportPath, cachePath, header["hash"])
+    return reportIndex
+
+def saveCachedIndex(reportIndex, reportPath, cachePath, reportHash=None):
+    '''Writes the index to the cache. Failing to write only costs the next run a parse.'''
+    reportStat = os.stat(reportPath)
+    header = {
+        "version": cacheFormatVersion,
+        "size": reportStat.st_size,
+        "mtime": reportStat.st_mtime_ns,
+        "hash": reportHash if reportHash is not None else hashFile(reportPath),
+        "byteorder": sys.byteorder,
+        "count": len(reportIndex),
+        "kindNames": reportIndex.kindNames,
+        "layout": _arrayLayout(reportIndex)}
+
+    tempPath = cachePath + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cachePath)), exist_ok=True)
+        with open(tempPath, 'wb') as writer:
+            writer.write(json.dumps(header).encode('utf-8') + b"\n")
+            writer.write(json.dumps(reportIndex.names).encode('utf-8') + b"\n")
+            for field in arrayFields:
+                getattr(reportIndex, field).tofile(writer)
+        os.replace(tempPath, cachePath)
+    except OSError as ex:
+        print("Unable to write coverage report cache [{}]: {}".format(cachePath, ex))
+
+def findIndex(reportPath, cacheDirectory=None):
+    '''Returns the cached index of a report, None when the report is not in the cache.'''
+    cachePath = cachePathFor(reportPath, cacheDirectory)
+    reportIndex = loadCachedIndex(reportPath, cachePath)
+    if reportIndex is not None:
+        print("Using cached coverage report [{}]".format(cachePath))
+    return reportIndex
+
+def loadIndex(reportPath, cacheDirectory=None) -> coverageIndex.CoverageIndex:
+    '''Returns the coverage index of a report, from the cache when the report
+    is unchanged, otherwise parsed and then stored in the cache.'''
+    reportIndex = findIndex(reportPath, cacheDirectory)
+    if reportIndex is not None:
+        return reportIndex
+
+    reportIndex = coverageIndex.fromReport(reportPath)
+    saveCachedIndex(reportIndex, reportPath, cachePathFor(reportPath, cacheDirectory))
+    return reportIndex
@@ -0,0 +1,105 @@
+"""Writes synthetic dotCover reports with a chosen assembly / namespace / type /
+method fan-out, to measure how coverage_tools scales on reports far larger
+than the ones in test_collaterals. Statements are drawn from a seeded random
+generator, so the same shape and seed always give the same report."""
+import json
+import random
+
+dotCoverVersion = "2021.1.3"
+
+class ReportShape:
+    '''Fan-out of a synthetic report: every assembly has `namespaces`
+    namespaces, every namespace `types` types and every type `methods`
+    methods. Methods with anonymous methods also get an OwnCoverage leaf,
+    the way dotCover reports them.'''
+
+    def __init__(self, assemblies=10, namespaces=5, types=20, methods=10, anonymousMethods=0, seed=0):
+        self.assemblies = assemblies
+        self.namespaces = namespaces
+        self.types = types
+        self.methods = methods
+        self.anonymousMethods = anonymousMethods
+        self.seed = seed
+
+    def nodeCount(self) -> int:
+        '''Number of nodes in the report, the root included.'''
+        methodNodes = 1 + (1 + self.anonymousMethods if self.anonymousMethods else 0)
+        return 1 + self.assemblies * (1 + self.namespaces * (1 + self.types * (1 + self.methods * methodNodes)))
+
+    def toDict(self) -> dict:
+        return {
+            "Assemblies": self.assemblies, "Namespaces": self.namespaces, "Types": self.types,
+            "Methods": self.methods, "AnonymousMethods": self.anonymousMethods, "Seed": self.seed}
+
+def _createNode(kind: str, name, covered: int, total: int) -> dict:
+    node = {"Kind": kind}
+    if name is not None:
+        node["Name"] = name
+    node["CoveredStatements"] = covered
+    node["TotalStatements"] = total
+    node["CoveragePercent"] = covered * 100 // total if total else 0
+    return node
+
+def _sumChildren(node: dict, kind: str, name: str) -> dict:
+    parent = _createNode(kind, name,
+                         sum(child["CoveredStatements"] for child in node),
+                         sum(child["TotalStatements"] for child in node))
+    parent["Children"] = node
+    return parent
+
+def _createMethod(rng: random.Random, name: str, quality: float, anonymousMethods: int) -> dict:
+    parts = []
+    for _ in range(1 + anonymousMethods):
+        total = rng.randint(1, 40)
+        covered = min(total, int(total * quality * 2 * rng.random() + 0.5))
+        parts.append((covered, total))
+
+    method = _createNode("Method", name, sum(part[0] for part in parts), sum(part[1] for part in parts))
+    if anonymousMethods:
+        ownCovered, ownTotal = parts[0]
+        method["Children"] = [_createNode("OwnCoverage", None, ownCovered, ownTotal)]
+        for i, (covered, total) in enumerate(parts[1:]):
+            method["Children"].append(_createNode("AnonymousMethod", "<Lambda{}>(int):bool".format(i), covered, total))
+    return method
+
+def createAssembly(shape: ReportShape, assemblyIndex: int) -> dict:
+    '''Returns one assembly of the report. Each assembly has its own random
+    stream, so any assembly can be created without creating the others.'''
+    rng = random.Random(shape.seed * 1000003 + assemblyIndex)
+    quality = rng.random() # how well tested the whole assembly is
+
+    namespaces = []
+    for namespaceIndex in range(shape.namespaces):
+        types = []
+        for typeIndex in range(shape.types):
+            methods = [_createMethod(rng, "Method{}(int,string):bool".format(methodIndex), quality, shape.anonymousMethods)
+                       for methodIndex in range(shape.methods)]
+            types.append(_sumChildren(methods, "Type", "Type{}".format(typeIndex)))
+        namespaces.append(_sumChildren(types, "Namespace", "Namespace{}".format(namespaceIndex)))
+    return _sumChildren(namespaces, "Assembly", "Synthetic.Assembly{}".format(assemblyIndex))
+
+def writeReport(outputPath, shape: ReportShape) -> int:
+    '''Writes the report and returns its size in bytes. Assemblies are
+    serialized one at a time, so memory is bounded by the largest assembly
+    rather than by the whole report.'''
+    # the root precedes its children in the file, so statements are summed first
+    covered = 0
+    total = 0
+    for assemblyIndex in range(shape.assemblies):
+        assembly = createAssembly(shape, assemblyIndex)
+        covered += assembly["CoveredStatements"]
+        total += assembly["TotalStatements"]
+
+    root = {"DotCoverVersion": dotCoverVersion}
+    root.update(_createNode("Root", None, covered, total))
+    rootText = json.dumps(root, indent=2)
+
+    written = 0
+    with open(outputPath, 'w', encoding='utf-8', newline='\n') as writer:
+        written += writer.write(rootText[:-2] + ',\n  "Children": [\n')
+        for assemblyIndex in range(shape.assemblies):
+            if assemblyIndex > 0:
+                written += writer.write(",\n")
+            written += writer.write(json.dumps(createAssembly(shape, assemblyIndex), indent=2))
+        written += writer.write("\n  ]\n}")
+    return written
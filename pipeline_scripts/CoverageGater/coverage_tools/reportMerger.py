@@ -0,0 +1,78 @@
+"""Merges the separate dotCover reports of the Analog, Common and Digital
+solutions into one coverage index. Reports are parsed in parallel, one
+process per report, and merged per assembly."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from coverage_tools import coverageIndex
+from coverage_tools import jsonObjectParser
+from coverage_tools import reportCache
+
+conflictingAssemblyExceptionMessage = """Found the same assembly in more than one
+coverage report with a different number of statements, the reports were not
+created from the same build."""
+
+class ConflictingAssemblyException(jsonObjectParser.RepeatAssemblyException):
+    pass
+
+def loadReportIndex(reportPath, useCache: bool = False, cacheDirectory=None) -> coverageIndex.CoverageIndex:
+    if useCache:
+        return reportCache.loadIndex(reportPath, cacheDirectory)
+    return coverageIndex.fromReport(reportPath)
+
+def _loadReportIndexTask(task):
+    return loadReportIndex(*task)
+
+def loadReportIndices(reportPaths, useCache: bool = False, cacheDirectory=None, processes=None) -> list:
+    '''Builds the index of every report, each one in its own worker process.'''
+    tasks = [(reportPath, useCache, cacheDirectory) for reportPath in reportPaths]
+    if len(tasks) == 1:
+        return [_loadReportIndexTask(tasks[0])]
+
+    if processes is None:
+        processes = min(len(tasks), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_loadReportIndexTask, tasks))
+
+def mergeIndices(indices) -> coverageIndex.CoverageIndex:
+    '''Merges the assemblies of several report indices. An assembly found in
+    more than one report must have the same TotalStatements in each, the
+    report covering the most statements of it is kept. The root statements
+    are the sums over the merged assemblies, not an average of percents.'''
+
+    # name -> (index, start, end) of the chosen assembly subtree
+    assemblies = {}
+    for reportIndex in indices:
+        for start, end in reportIndex.subtreeRanges(0):
+            name = reportIndex.names[start]
+            if name not in assemblies:
+                assemblies[name] = (reportIndex, start, end)
+                continue
+
+            chosenIndex, chosenStart, _ = assemblies[name]
+            if chosenIndex is reportIndex:
+                raise jsonObjectParser.RepeatAssemblyException(jsonObjectParser.repeatAssemblyExceptionMessage, name)
+            if chosenIndex.total[chosenStart] != reportIndex.total[start]:
+                raise ConflictingAssemblyException(conflictingAssemblyExceptionMessage, name)
+            if reportIndex.covered[start] > chosenIndex.covered[chosenStart]:
+                print("Assembly [{}] found in several reports, keeping the one with the most covered statements.".format(name))
+                assemblies[name] = (reportIndex, start, end)
+
+    merged = coverageIndex.CoverageIndex()
+    root = merged.append("Root", "", -1, 0, 0, 0)
+    for reportIndex, start, end in assemblies.values():
+        merged.appendSubtree(reportIndex, start, end, root)
+
+    assemblyRanges = merged.subtreeRanges(root)
+    rootCovered = sum(merged.covered[start] for start, _ in assemblyRanges)
+    rootTotal = sum(merged.total[start] for start, _ in assemblyRanges)
+    merged.covered[root] = rootCovered
+    merged.total[root] = rootTotal
+    merged.percents[root] = rootCovered * 100 // rootTotal if rootTotal else 0
+    return merged
+
+def mergeReports(reportPaths, useCache: bool = False, cacheDirectory=None, processes=None) -> coverageIndex.CoverageIndex:
+    '''Parses the reports in parallel and merges them into one index.'''
+    indices = loadReportIndices(reportPaths, useCache, cacheDirectory, processes)
+    if len(indices) == 1:
+        return indices[0]
+    return mergeIndices(indices)
@@ -0,0 +1,278 @@
+"""Watch mode of the gater. The reports are polled (plain os.stat, no file
+system notification dependency), and when dotCover rewrites them only the
+assemblies whose subtree changed are flattened and gated again. The changes
+in verdicts are printed after every update."""
+import hashlib
+import json
+import os
+import signal
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from coverage_tools import coverageIndex
+from coverage_tools import gateResult
+from coverage_tools import gater
+from coverage_tools import getArguments
+from coverage_tools import jsonObjectParser
+from coverage_tools import jsonTextParser
+from coverage_tools import regressionGater
+from coverage_tools import reportMerger
+from coverage_tools import xmlStreamParser
+
+def fileSignature(reportPaths) -> tuple:
+    '''Size and mtime of every report, None for a report that doesn't exist (yet).'''
+    signature = []
+    for reportPath in reportPaths:
+        try:
+            reportStat = os.stat(reportPath)
+            signature.append((reportStat.st_size, reportStat.st_mtime_ns))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+def subtreeFingerprint(reportIndex, start: int, end: int) -> str:
+    '''Fingerprint of the names and coverage of every node of a subtree. Parents
+    are stored relative to the subtree, so an assembly that only moved in
+    the report keeps its fingerprint.'''
+    digest = hashlib.sha1("\0".join(reportIndex.names[start:end]).encode('utf-8'))
+    digest.update(array('l', (parent - start for parent in reportIndex.parents[start:end])).tobytes())
+    for values in (reportIndex.kinds, reportIndex.covered, reportIndex.total, reportIndex.percents):
+        digest.update(values[start:end].tobytes())
+    return digest.hexdigest()
+
+def nodeFingerprint(assemblyNode: dict) -> str:
+    '''Fingerprint of an assembly node of a parsed JSON report. Serializing the
+    subtree runs in C and is much cheaper than flattening it.'''
+    return hashlib.sha1(json.dumps(assemblyNode, separators=(",", ":"), check_circular=False).encode('utf-8')).hexdigest()
+
+def assemblyFingerprints(reportIndex) -> dict:
+    '''Returns {assembly: fingerprint} where the fingerprint covers the names
+    and coverage of every node of the assembly subtree.'''
+    return {reportIndex.names[start]: subtreeFingerprint(reportIndex, start, end)
+            for start, end in reportIndex.subtreeRanges(0)}
+
+def indexAssemblies(reportIndex, previousFingerprints: dict) -> list:
+    '''Returns (name, fingerprint, covered, total, subtree index) of every
+    assembly of a flattened report. The subtree index is None when the
+    fingerprint matches the previous one.'''
+    assemblies = []
+    for start, end in reportIndex.subtreeRanges(0):
+        name = reportIndex.names[start]
+        fingerprint = subtreeFingerprint(reportIndex, start, end)
+        subtreeIndex = None
+        if previousFingerprints.get(name) != fingerprint:
+            subtreeIndex = coverageIndex.CoverageIndex()
+            subtreeIndex.appendSubtree(reportIndex, start, end, -1)
+        assemblies.append((name, fingerprint, reportIndex.covered[start], reportIndex.total[start], subtreeIndex))
+    return assemblies
+
+def readAssemblies(reportPath, previousFingerprints: dict) -> list:
+    '''Same as indexAssemblies for a report file, only the assemblies whose
+    fingerprint changed are flattened. XML reports are flattened whole.'''
+    if xmlStreamParser.isXMLReport(reportPath):
+        return indexAssemblies(coverageIndex.fromReport(reportPath), previousFingerprints)
+
+    assemblies = []
+    for node in jsonTextParser.createJSONObject(reportPath).get("Children", ()):
+        if node.get("Kind") in coverageIndex.skippedKinds:
+            continue
+        name = node.get("Name", "")
+        fingerprint = nodeFingerprint(node)
+        subtreeIndex = coverageIndex.fromJSONObject(node) if previousFingerprints.get(name) != fingerprint else None
+        assemblies.append((name, fingerprint, node.get("CoveredStatements", 0), node.get("TotalStatements", 0), subtreeIndex))
+    return assemblies
+
+def mergeAssemblies(reportAssemblies: list) -> dict:
+    '''Returns {name: (fingerprint, subtree index)} over the assemblies of every
+    report, choosing between reports the same way reportMerger.mergeIndices does.'''
+    chosen = {} # name -> (report number, covered, total, fingerprint, subtree index)
+    for reportNumber, assemblies in enumerate(reportAssemblies):
+        for name, fingerprint, covered, total, subtreeIndex in assemblies:
+            if name not in chosen:
+                chosen[name] = (reportNumber, covered, total, fingerprint, subtreeIndex)
+                continue
+
+            chosenNumber, chosenCovered, chosenTotal, _, _ = chosen[name]
+            if chosenNumber == reportNumber:
+                raise jsonObjectParser.RepeatAssemblyException(jsonObjectParser.repeatAssemblyExceptionMessage, name)
+            if chosenTotal != total:
+                raise reportMerger.ConflictingAssemblyException(reportMerger.conflictingAssemblyExceptionMessage, name)
+            if covered > chosenCovered:
+                chosen[name] = (reportNumber, covered, total, fingerprint, subtreeIndex)
+    return {name: (fingerprint, subtreeIndex) for name, (_, _, _, fingerprint, subtreeIndex) in chosen.items()}
+
+def scopedIndex(assemblies: dict, names) -> coverageIndex.CoverageIndex:
+    '''Index holding only the given assemblies, from their subtree indices.'''
+    index = coverageIndex.CoverageIndex()
+    root = index.append("Root", "", -1, 0, 0, 0)
+    for name in names:
+        subtreeIndex = assemblies[name][1]
+        index.appendSubtree(subtreeIndex, 0, len(subtreeIndex), root)
+    return index
+
+def changedAssemblies(previousFingerprints: dict, currentFingerprints: dict) -> tuple:
+    '''Returns (assemblies added or changed, assemblies removed).'''
+    changed = {name for name, fingerprint in currentFingerprints.items() if previousFingerprints.get(name) != fingerprint}
+    removed = set(previousFingerprints) - set(currentFingerprints)
+    return changed, removed
+
+def evaluateVerdicts(reportIndex, scriptArgs: getArguments.Arguments, baselineIndex=None) -> dict:
+    '''Returns {(kind, name): (verdict, coverage)} of the gating levels, without printing.'''
+    if baselineIndex is not None:
+        results = [regressionGater.evaluateRegressions(baselineIndex, reportIndex, scriptArgs)]
+    else:
+        results = [gater.evaluateNodes(reportIndex.coverageDict(kind), scriptArgs, kind) for kind in scriptArgs.gatingLevels]
+
+    verdicts = {}
+    for result in results:
+        for node in result.nodes:
+            verdicts[(node.kind, node.name)] = (node.verdict, node.coverage)
+    return verdicts
+
+def nodeAssemblies(reportIndex) -> dict:
+    '''Returns {(kind, qualified name): assembly} of every node below an
+    assembly, in one pass since parents precede their children.'''
+    qualifiedNames = reportIndex.qualifiedNames()
+    assemblyOfNode = []
+    nodeAssemblies = {}
+    for i, parent in enumerate(reportIndex.parents):
+        assembly = None
+        if parent == 0:
+            assembly = reportIndex.names[i]
+        elif parent > 0:
+            assembly = assemblyOfNode[parent]
+        assemblyOfNode.append(assembly)
+        if assembly is not None:
+            nodeAssemblies[(reportIndex.kindNames[reportIndex.kinds[i]], qualifiedNames[i])] = assembly
+    return nodeAssemblies
+
+def diffVerdicts(previousVerdicts: dict, currentVerdicts: dict) -> list:
+    '''Returns (kind, name, previous verdict, current verdict, coverage) of the
+    nodes whose verdict changed, appeared or disappeared.'''
+    diff = []
+    for key, (verdict, coverage) in currentVerdicts.items():
+        previous = previousVerdicts.get(key)
+        if previous is None or previous[0] != verdict:
+            diff.append((key[0], key[1], previous[0] if previous else None, verdict, coverage))
+    for key, (verdict, coverage) in previousVerdicts.items():
+        if key not in currentVerdicts:
+            diff.append((key[0], key[1], verdict, None, coverage))
+    return diff
+
+class ReportWatcher:
+    '''Keeps the verdicts of the last version of the reports and updates them
+    with the assemblies that changed in the new version.'''
+
+    def __init__(self, reportPaths, scriptArgs: getArguments.Arguments, baselineIndex=None):
+        self.reportPaths = reportPaths
+        self.scriptArgs = scriptArgs
+        self.baselineIndex = baselineIndex
+        self.fingerprints = {}
+        self.verdicts = {} # assembly -> {(kind, name): (verdict, coverage)}
+        self._signature = None
+        self._pendingSignature = None
+
+    def poll(self) -> bool:
+        '''True when the reports changed and stayed unchanged since the
+        previous poll, so a report dotCover is still writing isn't read.'''
+        signature = fileSignature(self.reportPaths)
+        if None in signature or signature == self._signature:
+            self._pendingSignature = None
+            return False
+        if signature != self._pendingSignature:
+            self._pendingSignature = signature
+            return False
+        self._signature = signature
+        self._pendingSignature = None
+        return True
+
+    def read(self, executor=None) -> dict:
+        '''Reads the reports, in the executor when given (one task per report),
+        returns the assemblies as in mergeAssemblies.'''
+        if executor is None:
+            reportAssemblies = [readAssemblies(reportPath, self.fingerprints) for reportPath in self.reportPaths]
+        else:
+            reportAssemblies = list(executor.map(readAssemblies, self.reportPaths, repeat(self.fingerprints)))
+        return mergeAssemblies(reportAssemblies)
+
+    def update(self, reportIndex) -> tuple:
+        '''Same as updateAssemblies for an already flattened report.'''
+        return self.updateAssemblies(mergeAssemblies([indexAssemblies(reportIndex, self.fingerprints)]))
+
+    def updateAssemblies(self, assemblies: dict) -> tuple:
+        '''Gates the assemblies that changed since the previous version.
+        Returns (verdict diff as in diffVerdicts, changed, removed).'''
+        currentFingerprints = {name: fingerprint for name, (fingerprint, _) in assemblies.items()}
+        changed, removed = changedAssemblies(self.fingerprints, currentFingerprints)
+        self.fingerprints = currentFingerprints
+
+        previousVerdicts = {}
+        for assembly in changed | removed:
+            previousVerdicts.update(self.verdicts.pop(assembly, {}))
+
+        currentVerdicts = {}
+        if changed:
+            changedIndex = scopedIndex(assemblies, changed)
+            currentVerdicts = evaluateVerdicts(changedIndex, self.scriptArgs, self.baselineIndex)
+            assemblyOfNode = nodeAssemblies(changedIndex)
+            for key, value in currentVerdicts.items():
+                self.verdicts.setdefault(assemblyOfNode[key], {})[key] = value
+
+        return diffVerdicts(previousVerdicts, currentVerdicts), changed, removed
+
+    def retry(self):
+        '''Reads the reports again on the next poll, after a failed read.'''
+        self._signature = None
+
+    def failingNodes(self) -> list:
+        return [name for assemblyVerdicts in self.verdicts.values()
+                for (kind, name), (verdict, _) in assemblyVerdicts.items() if verdict in gateResult.failingVerdicts]
+
+def printUpdate(diff: list, changed: set, removed: set, failingNodes: list, elapsed: float, initial: bool = False):
+    lines = ["Report updated, {} assemblies changed, {} removed, gated in {:.0f} ms".format(
+        len(changed), len(removed), elapsed * 1000)]
+    for kind, name, previousVerdict, verdict, coverage in diff:
+        if initial and verdict not in gateResult.failingVerdicts:
+            continue # the first version only lists what fails
+        lines.append("    {}=[{}] Verdict=[{} -> {}] Coverage=[{}]".format(kind, name, previousVerdict, verdict, coverage))
+    if failingNodes:
+        lines.append("{} gating nodes FAILED".format(len(failingNodes))) # the diff already names what changed
+    else:
+        lines.append("All gating nodes PASS")
+    print("\n".join(lines) + "\n", flush=True)
+
+def watch(reportPaths, scriptArgs: getArguments.Arguments, baselineIndex=None, interval: float = 0.25):
+    '''Polls the reports until interrupted (Ctrl+C), printing the verdicts that
+    change with every new version of the reports.'''
+    watcher = ReportWatcher(reportPaths, scriptArgs, baselineIndex)
+    print("Watching {} for changes, Ctrl+C to stop...\n".format(reportPaths), flush=True)
+
+    # a single report is read in-process, several share one pool for the whole watch
+    executor = None
+    if len(reportPaths) > 1:
+        # Ctrl+C stops the watch, the workers leave it to this process
+        executor = ProcessPoolExecutor(max_workers=min(len(reportPaths), os.cpu_count() or 1),
+                                       initializer=signal.signal, initargs=(signal.SIGINT, signal.SIG_IGN))
+
+    try:
+        while True:
+            if watcher.poll():
+                startTime = time.perf_counter()
+                try:
+                    assemblies = watcher.read(executor)
+                except (OSError, ValueError) as ex:
+                    # dotCover may replace the file between polls, try again on the next change
+                    print("Unable to read the coverage report: {}\n".format(ex), flush=True)
+                    watcher.retry()
+                else:
+                    initial = not watcher.fingerprints
+                    diff, changed, removed = watcher.updateAssemblies(assemblies)
+                    printUpdate(diff, changed, removed, watcher.failingNodes(), time.perf_counter() - startTime, initial)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return 0 if not watcher.failingNodes() else 1
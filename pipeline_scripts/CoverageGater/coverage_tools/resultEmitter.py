@@ -0,0 +1,171 @@
+"""Writes gate results (gateResult.GateResult) to the console, a JSON summary
+or a JUnit XML file. Every emitter renders all of its results into one string
+and writes it at once, so large reports don't pay for a write per node."""
+import abc
+import json
+import sys
+import xml.etree.ElementTree as ElementTree
+from coverage_tools import gateResult
+from coverage_tools import getArguments
+
+class ResultEmitter(abc.ABC):
+    '''Base of the emitters, emit() is given every GateResult to write.'''
+
+    @abc.abstractmethod
+    def render(self, results: list) -> str:
+        pass
+
+    @abc.abstractmethod
+    def write(self, text: str):
+        pass
+
+    def emit(self, results: list):
+        self.write(self.render(results))
+
+class FileEmitter(ResultEmitter):
+    def __init__(self, outputPath):
+        self.outputPath = outputPath
+
+    def write(self, text: str):
+        with open(self.outputPath, 'w', encoding='utf-8') as writer:
+            writer.write(text)
+        print("Gate results written to [{}]".format(self.outputPath))
+
+def _target(result, node):
+    return node.target if node.target is not None else result.coverageTarget
+
+class ConsoleEmitter(ResultEmitter):
+    '''The text the gater has always printed, which CI logs are read for.'''
+
+    def write(self, text: str):
+        sys.stdout.write(text)
+
+    def render(self, results: list) -> str:
+        lines = []
+        profileName = None
+        for result in results:
+            if result.profileName is not None and result.profileName != profileName:
+                lines += ["########## Profile [{}] ##########".format(result.profileName), ""]
+            profileName = result.profileName
+            if result.mode == gateResult.regressionMode:
+                self._renderRegression(result, lines)
+            else:
+                self._renderTarget(result, lines)
+        return "".join(line + "\n" for line in lines)
+
+    def _renderTarget(self, result, lines: list):
+        kind = result.kind
+        # assemblies keep the wording of the assembly-only gater, deeper kinds say nodes
+        nodes = "assemblies" if kind == "Assembly" else "nodes"
+        if kind == "Assembly":
+            lines += ["Checking if assemblies meet requirement...", ""]
+        else:
+            lines += ["Checking if {} nodes meet requirement...".format(kind), ""]
+
+        # an empty override list is still printed, only a missing one is "No ... detected"
+        if result.passOverride is not None:
+            lines += ["Pass override {0} detected, following {0} will always pass...".format(nodes), str(result.passOverride)]
+        else:
+            lines.append("No pass overrides detected...")
+        if result.failOverride is not None:
+            lines += ["Fail override {0} detected, following {0} will always fail...".format(nodes), str(result.failOverride)]
+        else:
+            lines.append("No fail overrides detected...")
+        lines.append("")
+
+        for node in result.nodes:
+            lines.append("{}=[{}] Coverage=[{}] Target=[{}]".format(kind, node.name, node.coverage, _target(result, node)))
+
+        for node in result.withVerdict(gateResult.failVerdict):
+            lines.append('{} [{}] coverage value [{}] does not meet target.'.format(kind, node.name, _target(result, node)))
+        lines.append("")
+        for node in result.withVerdict(gateResult.overriddenToFailVerdict):
+            lines.append('{} [{}] met coverage target [{}], but was overridden to fail.'.format(kind, node.name, _target(result, node)))
+        lines.append("")
+        for node in result.withVerdict(gateResult.overriddenToPassVerdict):
+            lines.append('{} [{}] did not meet the coverage target [{}], but was overridden to pass.'.format(kind, node.name, _target(result, node)))
+        lines.append("")
+
+    def _renderRegression(self, result, lines: list):
+        lines += ["Checking for regressions versus baseline [{}]...".format(result.baselineReportPath), ""]
+
+        for node in result.nodes:
+            if node.verdict in (gateResult.failVerdict, gateResult.overriddenToPassVerdict):
+                lines.append("{}=[{}] Covered=[{} -> {}] Total=[{} -> {}] Delta=[{:+.2f}]".format(
+                    node.kind, node.name, node.baselineCovered, node.covered, node.baselineTotal, node.total, node.delta))
+        lines += ["{} nodes not present in the baseline were skipped.".format(result.skippedNodes), ""]
+
+        for node in result.withVerdict(gateResult.failVerdict):
+            lines.append('[{}] regressed by more than [{}] points.'.format(node.name, result.regressionTolerance))
+        lines.append("")
+        for node in result.withVerdict(gateResult.overriddenToFailVerdict):
+            lines.append('[{}] did not regress, but was overridden to fail.'.format(node.name))
+        lines.append("")
+        for node in result.withVerdict(gateResult.overriddenToPassVerdict):
+            lines.append('[{}] regressed, but was overridden to pass.'.format(node.name))
+        lines.append("")
+
+def failingNames(results: list) -> list:
+    '''Failing nodes of every result that is not informational, without repeats.'''
+    names = []
+    for result in results:
+        if not result.informational:
+            names += [name for name in result.failingNames() if name not in names]
+    return names
+
+class JSONEmitter(FileEmitter):
+    def render(self, results: list) -> str:
+        failing = failingNames(results)
+        summary = {
+            "Verdict": gateResult.passVerdict if not failing else gateResult.failVerdict,
+            "FailingNodes": failing,
+            "Results": [result.toDict() for result in results]}
+        return json.dumps(summary, indent=2)
+
+class JUnitEmitter(FileEmitter):
+    '''One testsuite per GateResult and one testcase per node, so CI test
+    tabs show every failing node. Informational results never fail.'''
+
+    def render(self, results: list) -> str:
+        root = ElementTree.Element("testsuites", name="CoverageGater")
+        totalTests = 0
+        totalFailures = 0
+
+        for result in results:
+            suiteName = "{}.{}".format(result.mode, result.kind)
+            if result.profileName is not None:
+                suiteName = "{}.{}".format(result.profileName, suiteName)
+            suite = ElementTree.SubElement(root, "testsuite", name=suiteName)
+            failures = 0
+
+            for node in result.nodes:
+                testcase = ElementTree.SubElement(suite, "testcase", name=node.name, classname=suiteName)
+                if node.isFailing() and not result.informational:
+                    failures += 1
+                    ElementTree.SubElement(testcase, "failure", type=node.verdict, message=self._failureMessage(result, node))
+
+            suite.set("tests", str(len(result.nodes)))
+            suite.set("failures", str(failures))
+            totalTests += len(result.nodes)
+            totalFailures += failures
+
+        root.set("tests", str(totalTests))
+        root.set("failures", str(totalFailures))
+        return '<?xml version="1.0" encoding="utf-8"?>\n' + ElementTree.tostring(root, encoding="unicode")
+
+    def _failureMessage(self, result, node) -> str:
+        if node.verdict == gateResult.overriddenToFailVerdict:
+            return "Overridden to fail."
+        if result.mode == gateResult.regressionMode:
+            return "Coverage dropped by {:.2f} points, tolerance is {}.".format(-node.delta, result.regressionTolerance)
+        return "Coverage {} does not meet target {}.".format(node.coverage, _target(result, node))
+
+def createEmitters(scriptArgs: getArguments.Arguments) -> list:
+    '''The console and the file emitters requested by the arguments, written
+    once the run is complete.'''
+    emitters = [ConsoleEmitter()]
+    if scriptArgs.jsonResultPath:
+        emitters.append(JSONEmitter(scriptArgs.jsonResultPath))
+    if scriptArgs.junitResultPath:
+        emitters.append(JUnitEmitter(scriptArgs.junitResultPath))
+    return emitters
@@ -0,0 +1,80 @@
+"""Streaming reader for the XML and DetailedXML reports of dotCover
+(--ReportType="XML" / "DetailedXML"). The report is read with iterparse and
+every element is dropped as soon as it ends, so memory stays bounded by the
+depth of the tree rather than the size of the file.
+
+Nodes are yielded as the same dicts jsonStreamParser yields, so the
+assemblies can be given to jsonObjectParser.returnCoverageDict and the tree
+to coverageIndex.fromTree."""
+import xml.etree.ElementTree as ElementTree
+
+# elements of the coverage tree, FileIndices and Statement elements are not nodes
+nodeKinds = ("Root", "Assembly", "Namespace", "Type", "Method", "Constructor", "Property",
+             "AnonymousMethod", "OwnCoverage")
+_statementFields = ("CoveredStatements", "TotalStatements", "CoveragePercent")
+
+def isXMLReport(filepath) -> bool:
+    '''True when the report is XML (starts with '<'), False for JSON.'''
+    with open(filepath, 'rb') as reader:
+        head = reader.read(64).lstrip(b'\xef\xbb\xbf\xff\xfe\x00 \t\r\n')
+    return head.startswith(b'<')
+
+def _createNode(element) -> dict:
+    node = {"Kind": element.tag}
+    for key, value in element.attrib.items():
+        node[key] = int(value) if key in _statementFields else value
+    return node
+
+def _iterElements(filepath):
+    '''Yields (event, element) while dropping every element once it
+    ended. Siblings end in order and are removed as they end, so the ending
+    element is the first child of its parent (later siblings may already be
+    parsed ahead of the events) and removing it doesn't search.'''
+    parents = []
+    for event, element in ElementTree.iterparse(filepath, events=("start", "end")):
+        if event == "start":
+            yield event, element
+            parents.append(element)
+        else:
+            parents.pop()
+            yield event, element
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+
+def iterTree(filepath):
+    '''Yields (depth, node) for every node of the coverage tree in pre-order,
+    the root at depth 0.'''
+    depth = 0
+    for event, element in _iterElements(filepath):
+        if element.tag not in nodeKinds:
+            continue
+        if event == "start":
+            yield depth, _createNode(element)
+            depth += 1
+        else:
+            depth -= 1
+
+def iterNodes(filepath, depth: int = 1):
+    '''Yields the nodes at a depth of the tree, the assemblies by default. The
+    rest of the tree is only walked through.'''
+    for nodeDepth, node in iterTree(filepath):
+        if nodeDepth == depth:
+            yield node
+
+def iterStatements(filepath):
+    '''Yields (qualified method name, file, line, end line, covered) for every
+    statement of a DetailedXML report, for line level gating.'''
+    files = {}
+    names = []
+    for event, element in _iterElements(filepath):
+        if element.tag == "File" and event == "start":
+            files[element.get("Index")] = element.get("Name")
+        elif element.tag == "Statement" and event == "start":
+            yield (".".join(name for name in names[1:] if name), files.get(element.get("FileIndex")), int(element.get("Line", 0)),
+                   int(element.get("EndLine", element.get("Line", 0))), element.get("Covered") == "True")
+        elif element.tag in nodeKinds:
+            if event == "start":
+                names.append(element.get("Name", ""))
+            else:
+                names.pop()
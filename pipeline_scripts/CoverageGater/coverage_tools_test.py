@@ -2,6 +2,12 @@ import unittest
 from unittest.mock import patch
 import sys
 import json
+import io
+import os
+import codecs
+import tempfile
+import shutil
+import xml.etree.ElementTree as ElementTree
 from coverage_tools import *
 
 class Test_getArguments(unittest.TestCase):
@@ -90,6 +96,89 @@ class Test_getArguments(unittest.TestCase):
             self.assertTrue(isValid, "Args were not parsed correctly.")
             return
 
+    def test_getArguments_gatingLevels(self):
+        testargs = ["scriptPath",
+                   "--Report", "C:\\someDirectory\\sampleRepo\\coverageReport.json",
+                   "--Target", "90",
+                   "--Level", "Assembly,Type"]
+
+        with patch.object(sys, 'argv', testargs):
+            argObj = getArguments.getArguments()
+            self.assertTrue(argObj.gatingLevels == ["Assembly", "Type"], "Gating levels were not parsed correctly.")
+
+    def test_getArguments_repeatedReports(self):
+        testargs = ["scriptPath",
+                   "--Report", "analog.json",
+                   "--Report", "digital.json",
+                   "--Target", "90"]
+
+        with patch.object(sys, 'argv', testargs):
+            argObj = getArguments.getArguments()
+            self.assertTrue(argObj.reportPaths() == ["analog.json", "digital.json"], "Repeated reports were not collected.")
+
+    def test_getArguments_cacheOptIn(self):
+        reportArgs = ["scriptPath", "--Report", "coverageReport.json", "--Target", "90"]
+
+        with patch.object(sys, 'argv', reportArgs):
+            defaultArgs = getArguments.getArguments()
+        with patch.object(sys, 'argv', reportArgs + ["--CacheDirectory", "cache"]):
+            directoryArgs = getArguments.getArguments()
+        with patch.object(sys, 'argv', reportArgs + ["--UseCache"]):
+            flagArgs = getArguments.getArguments()
+
+        isValid = (not defaultArgs.useCache and directoryArgs.useCache and flagArgs.useCache)
+        self.assertTrue(isValid, "Report cache is not opt-in.")
+
+    def test_getArguments_profiles(self):
+        configObj = {
+            "CoverageReport": "coverageReport.json",
+            "CoverageTarget": 85,
+            "PassOverride": ["Test1"],
+            "Profiles": [
+                {"Name": "release"},
+                {"Name": "nightly", "CoverageTarget": 70, "GatingLevel": "Type", "Informational": True}]}
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            configPath = os.path.join(tempDir, "config.json")
+            with open(configPath, 'w') as writer:
+                json.dump(configObj, writer)
+
+            with patch.object(sys, 'argv', ["scriptPath", "--Config", configPath]):
+                argObj = getArguments.getArguments()
+
+        release, nightly = argObj.profiles
+        isValid = (
+            release.profileName == "release" and release.coverageTarget == 85 and release.passOverride == ["Test1"] and
+            nightly.coverageTarget == 70 and nightly.gatingLevels == ["Type"] and nightly.informational and
+            nightly.passOverride == ["Test1"] and not release.informational)
+        self.assertTrue(isValid, "Profiles were not created from the configuration file.")
+
+    def test_createProfile_missingName(self):
+        baseArgs = getArguments.Arguments("coverageReport.json", 90, None, None)
+        with self.assertRaises(getArguments.InvalidProfileException):
+            getArguments.createProfile(baseArgs, {"CoverageTarget": 70})
+
+    def test_getArguments_watchRejectsUnsupported(self):
+        testargs = ["scriptPath",
+                   "--Report", "coverageReport.json",
+                   "--Target", "90",
+                   "--Watch",
+                   "--JUnitResult", "result.xml"]
+
+        with patch.object(sys, 'argv', testargs):
+            with self.assertRaises(getArguments.InvalidWatchException):
+                getArguments.getArguments()
+
+    def test_getArguments_invalidGatingLevel(self):
+        testargs = ["scriptPath",
+                   "--Report", "C:\\someDirectory\\sampleRepo\\coverageReport.json",
+                   "--Target", "90",
+                   "--Level", "Statement"]
+
+        with patch.object(sys, 'argv', testargs):
+            with self.assertRaises(getArguments.InvalidGatingLevelException):
+                getArguments.getArguments()
+
 class Test_jsonTextParser(unittest.TestCase):
     '''Unit tests for jsonTextParser.py'''
 
@@ -102,6 +191,55 @@ class Test_jsonTextParser(unittest.TestCase):
         testJSON = '???123{\n"Hello":"World"\n}'
         self.assertTrue(jsonTextParser.correctJSONText(testJSON) == validJSON, "JSON was not modified to match corrected version")
 
+    def test_sniffJSONStart_skipsBOMAndPrefix(self):
+        utf8Start = jsonTextParser.sniffJSONStart(b'\xef\xbb\xbf??{"Hello":"World"}')
+        utf16Start = jsonTextParser.sniffJSONStart(codecs.BOM_UTF16_LE + '?{"Hello":"World"}'.encode('utf-16-le'))
+        noBrace = jsonTextParser.sniffJSONStart(b'\xef\xbb\xbf???')
+
+        isValid = (utf8Start == (5, 'utf-8') and utf16Start == (4, 'utf-16-le') and noBrace[0] is None)
+        self.assertTrue(isValid, "Start of the JSON text was not detected correctly.")
+
+    def test_createJSONObject_memoryMappedMatchesText(self):
+        reportPath = os.path.join("test_collaterals", "exampleReport.json")
+        with open(reportPath, 'rb') as reader:
+            testJSONBytes = reader.read()
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            prefixedPath = os.path.join(tempDir, "prefixedReport.json")
+            with open(prefixedPath, 'wb') as writer:
+                writer.write(codecs.BOM_UTF8 + b'garbage' + testJSONBytes)
+
+            mappedObject = jsonTextParser.createJSONObject(prefixedPath)
+            textObject = jsonTextParser.createJSONObject(reportPath, memoryMapped=False)
+
+        self.assertTrue(mappedObject == textObject, "Memory mapped report does not match the text parsed report.")
+
+class Test_jsonBackend(unittest.TestCase):
+    '''Unit tests for jsonBackend.py'''
+
+    def test_availableBackends_stdlibAlwaysLast(self):
+        self.assertTrue(jsonBackend.availableBackends()[-1] == "json", "stdlib json backend is not registered as the fallback.")
+
+    def test_loads_allBackendsAcceptBuffers(self):
+        testJSONBytes = b'{"Hello":"World","Count":3}'
+        for name in jsonBackend.availableBackends():
+            backend = jsonBackend.getBackend(name)
+            with memoryview(testJSONBytes) as view:
+                isValid = (backend.loads(view) == {"Hello": "World", "Count": 3} and backend.loads(testJSONBytes.decode()) == {"Hello": "World", "Count": 3})
+            self.assertTrue(isValid, "Backend [{}] did not decode the JSON text.".format(name))
+
+    def test_setBackend_unknownBackend(self):
+        with self.assertRaises(jsonBackend.UnknownBackendException):
+            jsonBackend.setBackend("notInstalledBackend")
+
+    def test_setBackend_environmentVariable(self):
+        previousBackend = jsonBackend.getBackend()
+        with patch.dict(os.environ, {jsonBackend.backendEnvironmentVariable: "json"}):
+            jsonBackend.setBackend()
+        isValid = (jsonBackend.getBackend().name == "json")
+        jsonBackend.setBackend(previousBackend.name)
+        self.assertTrue(isValid, "Backend from the environment variable was not selected.")
+
 class Test_jsonObjectParser(unittest.TestCase):
     '''Unit tests for jsonObjectParser.py'''
 
@@ -151,6 +289,617 @@ class Test_jsonObjectParser(unittest.TestCase):
 
         self.assertTrue(False, "No exception was raised when one was expected.")
 
+class Test_xmlStreamParser(unittest.TestCase):
+    '''Unit tests for xmlStreamParser.py'''
+    exampleReportPath = os.path.join("test_collaterals", "exampleReport.json")
+    exampleXMLReportPath = os.path.join("test_collaterals", "exampleReport.xml")
+    exampleDetailedReportPath = os.path.join("test_collaterals", "exampleDetailedReport.xml")
+
+    def test_iterNodes_matchesJSONCoverageDict(self):
+        jsonCoverage = jsonObjectParser.returnCoverageDict(jsonObjectParser.returnAllAssemblies(jsonTextParser.createJSONObject(self.exampleReportPath)))
+
+        isValid = (
+            jsonObjectParser.returnCoverageDict(xmlStreamParser.iterNodes(self.exampleXMLReportPath)) == jsonCoverage and
+            jsonObjectParser.returnCoverageDict(xmlStreamParser.iterNodes(self.exampleDetailedReportPath)) == jsonCoverage)
+        self.assertTrue(isValid, "XML coverage does not match the JSON report.")
+
+    def test_fromReport_xmlMatchesJSON(self):
+        jsonIndex = coverageIndex.fromReport(self.exampleReportPath)
+        xmlIndex = coverageIndex.fromReport(self.exampleDetailedReportPath)
+
+        isValid = (
+            xmlStreamParser.isXMLReport(self.exampleDetailedReportPath) and
+            not xmlStreamParser.isXMLReport(self.exampleReportPath) and
+            xmlIndex.qualifiedNames() == jsonIndex.qualifiedNames() and
+            list(xmlIndex.covered) == list(jsonIndex.covered))
+        self.assertTrue(isValid, "Index of the XML report does not match the JSON report.")
+
+    def test_iterStatements_detailedReport(self):
+        statements = list(xmlStreamParser.iterStatements(self.exampleDetailedReportPath))
+        methodName, filePath, line, endLine, isCovered = statements[0]
+
+        isValid = (
+            methodName == "BaseUtilities.DDG.BinMatrixServiceExtensions.EvaluateString(IBinMatrixService,string,int):string" and
+            filePath.endswith("Callbacks.cs") and line == endLine == 1 and isCovered)
+        self.assertTrue(isValid, "Statements of the detailed report were not read.")
+
+class Test_jsonStreamParser(unittest.TestCase):
+    '''Unit tests for jsonStreamParser.py'''
+    exampleReportPath = os.path.join("test_collaterals", "exampleReport.json")
+
+    def test_iterNodes_returnTwoAssemblies(self):
+        assemblies = list(jsonStreamParser.iterNodes(self.exampleReportPath))
+
+        isAmountValid = (len(assemblies) == 2)
+        isNamesValid = (assemblies[0]["Name"] == 'BaseUtilities' and assemblies[1]["Name"] == 'CallbacksManager')
+        isChildrenSkipped = all("Children" not in assembly for assembly in assemblies)
+        self.assertTrue(isAmountValid and isNamesValid and isChildrenSkipped, "Returned nodes do not behave as expected")
+
+    def test_iterNodes_matchesJSONObject(self):
+        with open(self.exampleReportPath) as reader:
+            testJSONObject = json.loads(reader.read())
+        expectedDict = jsonObjectParser.returnCoverageDict(jsonObjectParser.returnAllAssemblies(testJSONObject))
+
+        streamedDict = jsonObjectParser.returnCoverageDict(jsonStreamParser.iterNodes(self.exampleReportPath))
+        self.assertTrue(streamedDict == expectedDict, "Streamed coverage does not match the parsed report.")
+
+    def test_readNodes_garbagePrefixSmallChunks(self):
+        with open(self.exampleReportPath) as reader:
+            testJSONText = 'ï»¿' + reader.read()
+
+        with patch.object(jsonStreamParser, 'readChunkSize', 7):
+            types = list(jsonStreamParser.readNodes(io.StringIO(testJSONText), depth=3))
+
+        self.assertTrue(len(types) == 9 and all(node["Kind"] == "Type" for node in types), "Types were not read across chunk boundaries.")
+
+    def test_readNodes_bracketsInsideSkippedStrings(self):
+        testJSONText = '{"Children": [{"Name": "A", "Children": [{"Name": "M(int[],string{}):\\"]\\"", "Children": []}]}, {"Name": "B"}]}'
+        names = [node["Name"] for node in jsonStreamParser.readNodes(io.StringIO(testJSONText))]
+        self.assertTrue(names == ["A", "B"], "Brackets inside strings were not skipped.")
+
+    def test_readNodes_truncatedReport(self):
+        with self.assertRaises(jsonStreamParser.InvalidJSONException):
+            list(jsonStreamParser.readNodes(io.StringIO('{"Children": [{"Name": "A", "Children": [{')))
+
+class Test_coverageIndex(unittest.TestCase):
+    '''Unit tests for coverageIndex.py'''
+    exampleReportPath = os.path.join("test_collaterals", "exampleReport.json")
+
+    def test_fromReport_streamingMatchesParsed(self):
+        parsedIndex = coverageIndex.fromReport(self.exampleReportPath)
+        streamedIndex = coverageIndex.fromReport(self.exampleReportPath, streaming=True)
+
+        isValid = (
+            len(parsedIndex) == 1 + 2 + 2 + 9 + 31 + 6 and
+            parsedIndex.qualifiedNames() == streamedIndex.qualifiedNames() and
+            parsedIndex.parents == streamedIndex.parents and
+            parsedIndex.covered == streamedIndex.covered and
+            parsedIndex.total == streamedIndex.total)
+        self.assertTrue(isValid, "Streamed and parsed indices do not match.")
+
+    def test_coverageDict_assemblyMatchesReturnCoverageDict(self):
+        reportIndex = coverageIndex.fromReport(self.exampleReportPath)
+        self.assertTrue(reportIndex.coverageDict("Assembly") == {"BaseUtilities": 96, "CallbacksManager": 100}, "Assembly coverage does not match the report.")
+
+    def test_belowTarget_typeLevel(self):
+        reportIndex = coverageIndex.fromReport(self.exampleReportPath)
+        qualifiedNames = reportIndex.qualifiedNames()
+        failingTypes = [qualifiedNames[i] for i in reportIndex.belowTarget("Type", 90)]
+        self.assertTrue(failingTypes == ["BaseUtilities.DDG.TestProgramServiceExtensions"], "Types under target were not detected.")
+
+    def test_coverageDict_repeatName(self):
+        reportIndex = coverageIndex.CoverageIndex()
+        root = reportIndex.append("Root", "", -1, 2, 4)
+        reportIndex.append("Assembly", "Test1", root, 1, 2)
+        reportIndex.append("Assembly", "Test1", root, 1, 2)
+
+        with self.assertRaises(jsonObjectParser.RepeatAssemblyException):
+            reportIndex.coverageDict("Assembly")
+
+class Test_regressionGater(unittest.TestCase):
+    '''Unit tests for regressionGater.py'''
+
+    def createIndex(self, typeStatements):
+        reportIndex = coverageIndex.CoverageIndex()
+        root = reportIndex.append("Root", "", -1, 0, 0)
+        assembly = reportIndex.append("Assembly", "Test1", root, sum(c for c, t in typeStatements.values()), sum(t for c, t in typeStatements.values()))
+        for name, (covered, total) in typeStatements.items():
+            reportIndex.append("Type", name, assembly, covered, total)
+        return reportIndex
+
+    def test_joinIndices_newNodeHasNoBaseline(self):
+        baselineIndex = self.createIndex({"TypeA": (5, 10)})
+        currentIndex = self.createIndex({"TypeA": (5, 10), "TypeB": (1, 10)})
+        joinedNodes = regressionGater.joinIndices(baselineIndex, currentIndex, ["Type"])
+
+        isValid = (joinedNodes == [("Test1.TypeA", "Type", 2, 2), ("Test1.TypeB", "Type", None, 3)])
+        self.assertTrue(isValid, "Nodes were not joined by qualified name.")
+
+    def test_determineRegressions_detectsDrop(self):
+        baselineIndex = self.createIndex({"TypeA": (9, 10), "TypeB": (5, 10)})
+        currentIndex = self.createIndex({"TypeA": (8, 10), "TypeB": (12, 20), "TypeC": (0, 10)})
+        scriptArgs = getArguments.Arguments(None, 90, None, None, ["Assembly", "Type"])
+        regressedNodes = regressionGater.determineRegressions(baselineIndex, currentIndex, scriptArgs)
+
+        self.assertTrue(regressedNodes == ["Test1", "Test1.TypeA"], "Regressed nodes were not detected.")
+
+    def test_determineRegressions_withinTolerance(self):
+        baselineIndex = self.createIndex({"TypeA": (9, 10), "TypeB": (9, 10)})
+        currentIndex = self.createIndex({"TypeA": (8, 10), "TypeB": (86, 100)})
+        scriptArgs = getArguments.Arguments(None, 90, None, None, ["Assembly", "Type"], regressionTolerance=5)
+        regressedNodes = regressionGater.determineRegressions(baselineIndex, currentIndex, scriptArgs)
+
+        self.assertTrue(regressedNodes == ["Test1.TypeA"], "Regression tolerance was not applied.")
+
+class Test_reportCache(unittest.TestCase):
+    '''Unit tests for reportCache.py'''
+
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.reportPath = os.path.join(self.tempDir.name, "coverLogComplete.json")
+        self.cacheDirectory = os.path.join(self.tempDir.name, "cache")
+        shutil.copy(os.path.join("test_collaterals", "exampleReport.json"), self.reportPath)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def test_loadIndex_hitSkipsParsing(self):
+        firstIndex = reportCache.loadIndex(self.reportPath, self.cacheDirectory)
+
+        with patch.object(coverageIndex, 'fromReport', side_effect=AssertionError("report was parsed again")):
+            cachedIndex = reportCache.loadIndex(self.reportPath, self.cacheDirectory)
+
+        isValid = (
+            cachedIndex.qualifiedNames() == firstIndex.qualifiedNames() and
+            cachedIndex.coverageDict("Type") == firstIndex.coverageDict("Type") and
+            list(cachedIndex.covered) == list(firstIndex.covered))
+        self.assertTrue(isValid, "Cached index does not match the parsed one.")
+
+    def test_loadIndex_touchedReportHitsOnHash(self):
+        reportCache.loadIndex(self.reportPath, self.cacheDirectory)
+        os.utime(self.reportPath, ns=(0, 0))
+
+        with patch.object(coverageIndex, 'fromReport', side_effect=AssertionError("report was parsed again")):
+            reportCache.loadIndex(self.reportPath, self.cacheDirectory)
+
+    def test_loadIndex_changedReportMisses(self):
+        reportCache.loadIndex(self.reportPath, self.cacheDirectory)
+        with open(self.reportPath, 'r') as reader:
+            reportText = reader.read()
+        with open(self.reportPath, 'w') as writer:
+            writer.write(reportText.replace('"CoveragePercent": 96', '"CoveragePercent": 42'))
+        os.utime(self.reportPath, ns=(0, 0))
+
+        reportIndex = reportCache.loadIndex(self.reportPath, self.cacheDirectory)
+        self.assertTrue(reportIndex.coverageDict()["BaseUtilities"] == 42, "Changed report was served from the cache.")
+
+    def test_loadIndex_corruptCacheMisses(self):
+        reportCache.loadIndex(self.reportPath, self.cacheDirectory)
+        cachePath = reportCache.cachePathFor(self.reportPath, self.cacheDirectory)
+        with open(cachePath, 'r+b') as writer:
+            writer.truncate(os.path.getsize(cachePath) - 1)
+
+        self.assertTrue(reportCache.findIndex(self.reportPath, self.cacheDirectory) is None, "Truncated cache was not treated as a miss.")
+
+    def test_cachePathFor_outsideReportFolder(self):
+        cachePath = reportCache.cachePathFor(self.reportPath)
+        isValid = (
+            os.path.dirname(cachePath) == reportCache.defaultCacheDirectory and
+            os.path.dirname(cachePath) != os.path.dirname(self.reportPath))
+        self.assertTrue(isValid, "Cache is written next to the published report.")
+
+    def test_cachePathFor_cacheDirectory(self):
+        cachePath = reportCache.cachePathFor(self.reportPath, self.cacheDirectory)
+        reportCache.loadIndex(self.reportPath, self.cacheDirectory)
+        self.assertTrue(os.path.exists(cachePath), "Cache was not written to the cache directory.")
+
+class Test_reportMerger(unittest.TestCase):
+    '''Unit tests for reportMerger.py'''
+
+    def createIndex(self, assemblyStatements):
+        reportIndex = coverageIndex.CoverageIndex()
+        root = reportIndex.append("Root", "", -1, 0, 0)
+        for name, (covered, total) in assemblyStatements.items():
+            assembly = reportIndex.append("Assembly", name, root, covered, total)
+            reportIndex.append("Type", "Type" + name, assembly, covered, total)
+        return reportIndex
+
+    def test_mergeIndices_sumsDisjointAssemblies(self):
+        analogIndex = self.createIndex({"Test1": (1, 4)})
+        digitalIndex = self.createIndex({"Test2": (2, 2), "Test3": (0, 4)})
+        merged = reportMerger.mergeIndices([analogIndex, digitalIndex])
+
+        isValid = (
+            merged.coverageDict("Assembly") == {"Test1": 25, "Test2": 100, "Test3": 0} and
+            merged.coverageDict("Type") == {"Test1.TypeTest1": 25, "Test2.TypeTest2": 100, "Test3.TypeTest3": 0} and
+            (merged.covered[0], merged.total[0], merged.percents[0]) == (3, 10, 30))
+        self.assertTrue(isValid, "Reports were not merged by summing statements.")
+
+    def test_mergeIndices_sameAssemblyKeepsMostCovered(self):
+        commonIndex = self.createIndex({"Test1": (1, 4)})
+        digitalIndex = self.createIndex({"Test1": (3, 4)})
+        merged = reportMerger.mergeIndices([commonIndex, digitalIndex])
+
+        self.assertTrue(merged.coverageDict("Assembly") == {"Test1": 75}, "Repeated assembly was not merged.")
+
+    def test_mergeIndices_conflictingAssembly(self):
+        commonIndex = self.createIndex({"Test1": (1, 4)})
+        digitalIndex = self.createIndex({"Test1": (1, 5)})
+
+        with self.assertRaises(reportMerger.ConflictingAssemblyException):
+            reportMerger.mergeIndices([commonIndex, digitalIndex])
+
+    def test_mergeReports_parallelWorkers(self):
+        reportPath = os.path.join("test_collaterals", "exampleReport.json")
+        with open(reportPath) as reader:
+            testJSONObject = json.loads(reader.read())
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            reportPaths = []
+            for assembly in testJSONObject["Children"]:
+                solutionReport = dict(testJSONObject, Children=[assembly])
+                reportPaths.append(os.path.join(tempDir, assembly["Name"] + ".json"))
+                with open(reportPaths[-1], 'w') as writer:
+                    json.dump(solutionReport, writer)
+
+            merged = reportMerger.mergeReports(reportPaths, useCache=False, processes=2)
+
+        expectedIndex = coverageIndex.fromReport(reportPath)
+        self.assertTrue(merged.qualifiedNames() == expectedIndex.qualifiedNames(), "Merged reports do not match the complete report.")
+
+class Test_hotspotReport(unittest.TestCase):
+    '''Unit tests for hotspotReport.py'''
+    exampleReportPath = os.path.join("test_collaterals", "exampleReport.json")
+
+    def test_findHotspots_boundedAndSorted(self):
+        records = [("Method{}".format(i), "Method", i, 10, None) for i in range(10)]
+        hotspots = hotspotReport.findHotspots(records, 3)
+
+        self.assertTrue(hotspots[None]["Method"] == [(9, 10, "Method9"), (8, 10, "Method8"), (7, 10, "Method7")], "Hotspots were not bounded to the top entries.")
+
+    def test_indexRecords_matchTreeRecords(self):
+        reportIndex = coverageIndex.fromReport(self.exampleReportPath)
+        scopes = ["BaseUtilities"]
+        indexHotspots = hotspotReport.findHotspots(hotspotReport.indexRecords(reportIndex, scopes), 5)
+        treeHotspots = hotspotReport.findHotspots(hotspotReport.treeRecords(jsonStreamParser.iterTree(self.exampleReportPath), scopes), 5)
+
+        self.assertTrue(indexHotspots == treeHotspots, "Index and streamed hotspots do not match.")
+
+    def test_findHotspots_perFailingScope(self):
+        reportIndex = coverageIndex.fromReport(self.exampleReportPath)
+        hotspots = hotspotReport.findHotspots(hotspotReport.indexRecords(reportIndex, ["BaseUtilities"]), 1)
+
+        isValid = (
+            set(hotspots.keys()) == {None, "BaseUtilities"} and
+            hotspots["BaseUtilities"]["Type"] == [(16, 62, "BaseUtilities.DDG.TestProgramServiceExtensions")])
+        self.assertTrue(isValid, "Hotspots were not grouped by failing assembly.")
+
+class Test_changeMapper(unittest.TestCase):
+    '''Unit tests for changeMapper.py'''
+    exampleReportPath = os.path.join("test_collaterals", "exampleReport.json")
+
+    def setUp(self):
+        self.repositoryRoot = tempfile.mkdtemp()
+        projects = {
+            os.path.join("src", "Base", "DTS", "DTSBase.csproj"): '<Project Sdk="Microsoft.NET.Sdk" />',
+            os.path.join("src", "Base", "DTS.UnitTest", "DTSBase.UnitTest.csproj"):
+                '<Project><ItemGroup><ProjectReference Include="..\\DTS\\DTSBase.csproj" /></ItemGroup></Project>',
+            os.path.join("src", "TestMethods", "Common", "Pup", "PupCallbacks.csproj"):
+                '<Project><PropertyGroup><AssemblyName>PupCallBacks</AssemblyName></PropertyGroup></Project>',
+            os.path.join("src", "TestMethods", "Common", "Pup", "bin", "Stale.csproj"): '<Project />'}
+        for projectPath, projectText in projects.items():
+            projectPath = os.path.join(self.repositoryRoot, projectPath)
+            os.makedirs(os.path.dirname(projectPath), exist_ok=True)
+            with open(projectPath, 'w') as writer:
+                writer.write(projectText)
+
+    def tearDown(self):
+        shutil.rmtree(self.repositoryRoot)
+
+    def test_buildAssemblyMap_projectLayout(self):
+        assemblyMap = changeMapper.buildAssemblyMap(os.path.join(self.repositoryRoot, "src"), self.repositoryRoot)
+
+        isValid = (
+            assemblyMap == {
+                "src/Base/DTS": ["DTSBase"],
+                "src/Base/DTS.UnitTest": ["DTSBase.UnitTest", "DTSBase"],
+                "src/TestMethods/Common/Pup": ["PupCallBacks"]})
+        self.assertTrue(isValid, "Project folders were not mapped to their assemblies.")
+
+    def test_mapChangedPaths_closestProjectFolder(self):
+        assemblyMap = changeMapper.buildAssemblyMap(os.path.join(self.repositoryRoot, "src"), self.repositoryRoot)
+        changedPaths = [
+            "src/Base/DTS.UnitTest/DTSTests.cs",
+            "src\\TestMethods\\Common\\Pup\\Callbacks\\Pup.cs",
+            "README.md"]
+
+        assemblies = changeMapper.mapChangedPaths(changedPaths, assemblyMap)
+        self.assertTrue(assemblies == {"DTSBase.UnitTest", "DTSBase", "PupCallBacks"}, "Changed files were not mapped to their assemblies.")
+
+    def test_loadOrBuildAssemblyMap_savesMap(self):
+        mapPath = os.path.join(self.repositoryRoot, "assemblyMap.json")
+        builtMap = changeMapper.loadOrBuildAssemblyMap(mapPath, os.path.join(self.repositoryRoot, "src"), self.repositoryRoot)
+
+        with patch.object(changeMapper, "buildAssemblyMap") as buildAssemblyMap:
+            loadedMap = changeMapper.loadOrBuildAssemblyMap(mapPath, os.path.join(self.repositoryRoot, "src"), self.repositoryRoot)
+            self.assertTrue(loadedMap == builtMap and not buildAssemblyMap.called, "Saved assembly map was not reused.")
+
+    def test_scopeIndex_keepsChosenSubtrees(self):
+        reportIndex = coverageIndex.fromReport(self.exampleReportPath)
+        assemblyName = reportIndex.names[reportIndex.subtreeRanges(0)[0][0]]
+        scopedIndex = changeMapper.scopeIndex(reportIndex, {assemblyName})
+
+        isValid = (
+            list(scopedIndex.coverageDict("Assembly").keys()) == [assemblyName] and
+            all(name.startswith(assemblyName + ".") for name in scopedIndex.coverageDict("Type")))
+        self.assertTrue(isValid, "Scoped index holds nodes of other assemblies.")
+
+    def test_failingAssemblies_judgedWithTargets(self):
+        policy = coveragePolicy.CoveragePolicy(90, targets={"Low.*": 50})
+        assemblyCoverage = {"Untouched": 80, "Low.Assembly": 60, "Covered": 95}
+
+        failing = changeMapper.failingAssemblies(assemblyCoverage, policy)
+        self.assertTrue(failing == {"Untouched"}, "Already failing assemblies were not judged against their targets.")
+
+class Test_resultEmitter(unittest.TestCase):
+    '''Unit tests for resultEmitter.py'''
+    overrideArguments = getArguments.Arguments(None, 90, ["Test3"], ["Test1"])
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+        self.result = gater.evaluateNodes({"Test1": 100, "Test2": 50, "Test3": 10}, self.overrideArguments, "Assembly")
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDirectory)
+
+    def test_consoleEmitter_singleWrite(self):
+        with patch("sys.stdout") as stdout:
+            resultEmitter.ConsoleEmitter().emit([self.result])
+
+        output = stdout.write.call_args[0][0]
+        isValid = (
+            stdout.write.call_count == 1 and
+            "Assembly [Test2] coverage value [90] does not meet target." in output and
+            "Assembly [Test1] met coverage target [90], but was overridden to fail." in output)
+        self.assertTrue(isValid, "Console output was not written at once.")
+
+    def test_consoleEmitter_assemblyBaselineText(self):
+        # the text of the assembly-only gater, CI logs are scraped for it
+        baselineText = (
+            "Checking if assemblies meet requirement...\n"
+            "\n"
+            "Pass override assemblies detected, following assemblies will always pass...\n"
+            "['Test3']\n"
+            "Fail override assemblies detected, following assemblies will always fail...\n"
+            "[]\n"
+            "\n"
+            "Assembly=[Test1] Coverage=[100] Target=[90]\n"
+            "Assembly=[Test2] Coverage=[50] Target=[90]\n"
+            "Assembly=[Test3] Coverage=[10] Target=[90]\n"
+            "Assembly [Test2] coverage value [90] does not meet target.\n"
+            "\n"
+            "\n"
+            "Assembly [Test3] did not meet the coverage target [90], but was overridden to pass.\n"
+            "\n")
+        result = gater.evaluateNodes({"Test1": 100, "Test2": 50, "Test3": 10}, getArguments.Arguments(None, 90, ["Test3"], []), "Assembly")
+        noOverrideResult = gater.evaluateNodes({"Test1": 100}, getArguments.Arguments(None, 90, None, None), "Assembly")
+
+        output = resultEmitter.ConsoleEmitter().render([result])
+        noOverrideOutput = resultEmitter.ConsoleEmitter().render([noOverrideResult])
+        isValid = (
+            output == baselineText and
+            "No pass overrides detected...\nNo fail overrides detected...\n" in noOverrideOutput)
+        self.assertTrue(isValid, "Assembly console output differs from the text of the assembly-only gater.")
+
+    def test_consoleEmitter_profileHeaders(self):
+        release = gater.evaluateNodes({"Test1": 100}, getArguments.Arguments(None, 90, None, None), "Assembly")
+        release.profileName = "release"
+        nightly = gater.evaluateNodes({"Test1": 100}, getArguments.Arguments(None, 70, None, None), "Type")
+        nightly.profileName = "nightly"
+
+        output = resultEmitter.ConsoleEmitter().render([release, nightly])
+        isValid = (
+            output.startswith("########## Profile [release] ##########\n") and
+            output.count("########## Profile [") == 2)
+        self.assertTrue(isValid, "Profile headers were not written once per profile.")
+
+    def test_createEmitters_consoleFirst(self):
+        scriptArgs = getArguments.Arguments(None, 90, None, None, jsonResultPath=os.path.join(self.outputDirectory, "result.json"))
+        emitters = resultEmitter.createEmitters(scriptArgs)
+
+        isValid = (
+            len(emitters) == 2 and
+            isinstance(emitters[0], resultEmitter.ConsoleEmitter) and
+            isinstance(emitters[1], resultEmitter.JSONEmitter))
+        self.assertTrue(isValid, "Console output is not one of the emitters.")
+        with self.assertRaises(TypeError):
+            resultEmitter.ResultEmitter()
+
+    def test_jsonEmitter_summary(self):
+        outputPath = os.path.join(self.outputDirectory, "result.json")
+        resultEmitter.JSONEmitter(outputPath).emit([self.result])
+        with open(outputPath) as reader:
+            summary = json.load(reader)
+
+        isValid = (
+            summary["Verdict"] == "FAIL" and
+            summary["FailingNodes"] == ["Test2", "Test1"] and
+            [node["Verdict"] for node in summary["Results"][0]["Nodes"]] == ["OVERRIDE_FAIL", "FAIL", "OVERRIDE_PASS"])
+        self.assertTrue(isValid, "JSON summary does not match the gate result.")
+
+    def test_junitEmitter_informationalNeverFails(self):
+        informationalResult = gater.evaluateNodes({"Test4": 0}, self.overrideArguments, "Type")
+        informationalResult.informational = True
+        outputPath = os.path.join(self.outputDirectory, "result.xml")
+        resultEmitter.JUnitEmitter(outputPath).emit([self.result, informationalResult])
+
+        root = ElementTree.parse(outputPath).getroot()
+        isValid = (
+            root.get("tests") == "4" and root.get("failures") == "2" and
+            [suite.get("failures") for suite in root.iter("testsuite")] == ["2", "0"])
+        self.assertTrue(isValid, "JUnit failures do not match the gate result.")
+
+class Test_reportGenerator(unittest.TestCase):
+    '''Unit tests for reportGenerator.py'''
+    shape = reportGenerator.ReportShape(assemblies=3, namespaces=2, types=3, methods=4, anonymousMethods=1, seed=7)
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+        self.reportPath = os.path.join(self.outputDirectory, "syntheticReport.json")
+        reportGenerator.writeReport(self.reportPath, self.shape)
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDirectory)
+
+    def test_writeReport_nodeCount(self):
+        nodeCount = sum(1 for _ in jsonStreamParser.iterTree(self.reportPath))
+        self.assertTrue(nodeCount == self.shape.nodeCount(), "Synthetic report does not have the requested fan-out.")
+
+    def test_writeReport_consistentStatements(self):
+        jsonObject = jsonTextParser.createJSONObject(self.reportPath)
+        assemblies = jsonObjectParser.returnAllAssemblies(jsonObject)
+
+        isValid = (
+            jsonObject["TotalStatements"] == sum(assembly["TotalStatements"] for assembly in assemblies) and
+            jsonObject["CoveredStatements"] == sum(assembly["CoveredStatements"] for assembly in assemblies) and
+            assemblies[1] == reportGenerator.createAssembly(self.shape, 1))
+        self.assertTrue(isValid, "Synthetic report statements are not consistent.")
+
+class Test_coverageHistory(unittest.TestCase):
+    '''Unit tests for coverageHistory.py'''
+    exampleReportPath = os.path.join("test_collaterals", "exampleReport.json")
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+        self.connection = coverageHistory.openHistory(os.path.join(self.outputDirectory, "history.db"))
+        self.reportIndex = coverageIndex.fromReport(self.exampleReportPath)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.outputDirectory)
+
+    def test_nodeTrend_newestFirst(self):
+        coverageHistory.recordRun(self.connection, self.reportIndex, "commit1")
+        coverageHistory.recordRun(self.connection, self.reportIndex, "commit2")
+        trend = coverageHistory.nodeTrend(self.connection, "BaseUtilities")
+
+        isValid = (
+            [run[1] for run in trend] == ["commit2", "commit1"] and
+            trend[0][3:] == (422, 438))
+        self.assertTrue(isValid, "Trend of the assembly does not match the recorded runs.")
+
+    def test_findDrops_betweenLatestRuns(self):
+        coverageHistory.recordRun(self.connection, self.reportIndex, "commit1")
+        droppedIndex = coverageIndex.fromReport(self.exampleReportPath)
+        assembly = droppedIndex.names.index("BaseUtilities")
+        droppedIndex.covered[assembly] = 300
+        coverageHistory.recordRun(self.connection, droppedIndex, "commit2")
+
+        drops = coverageHistory.findDrops(self.connection, "Assembly", 5)
+        self.assertTrue([drop[0] for drop in drops] == ["BaseUtilities"], "Coverage drop was not found.")
+
+    def test_findDrops_singleRun(self):
+        coverageHistory.recordRun(self.connection, self.reportIndex, "commit1")
+        self.assertTrue(coverageHistory.findDrops(self.connection, "Assembly", 0) == [], "Drops were found without a previous run.")
+
+class Test_reportWatcher(unittest.TestCase):
+    '''Unit tests for reportWatcher.py'''
+    exampleReportPath = os.path.join("test_collaterals", "exampleReport.json")
+    commonArguments = getArguments.Arguments(None, 90, None, None, ["Assembly", "Type"])
+
+    def test_update_onlyChangedAssemblies(self):
+        watcher = reportWatcher.ReportWatcher([self.exampleReportPath], self.commonArguments)
+        _, initialChanged, _ = watcher.update(coverageIndex.fromReport(self.exampleReportPath))
+        unchangedDiff, unchangedAssemblies, _ = watcher.update(coverageIndex.fromReport(self.exampleReportPath))
+
+        changedIndex = coverageIndex.fromReport(self.exampleReportPath)
+        changedIndex.percents[changedIndex.names.index("BaseUtilities")] = 10
+        diff, changed, removed = watcher.update(changedIndex)
+
+        isValid = (
+            initialChanged == {"BaseUtilities", "CallbacksManager"} and
+            unchangedDiff == [] and unchangedAssemblies == set() and
+            changed == {"BaseUtilities"} and removed == set() and
+            diff == [("Assembly", "BaseUtilities", "PASS", "FAIL", 10)] and
+            "BaseUtilities" in watcher.failingNodes())
+        self.assertTrue(isValid, "Watcher did not re-gate only the changed assembly.")
+
+    def test_readAssemblies_flattensOnlyChanged(self):
+        watcher = reportWatcher.ReportWatcher([self.exampleReportPath], self.commonArguments)
+        initialAssemblies = watcher.read()
+        watcher.updateAssemblies(initialAssemblies)
+        unchangedAssemblies = watcher.read()
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            reportPath = os.path.join(tempDir, "report.json")
+            with open(self.exampleReportPath, 'r') as reader:
+                reportText = reader.read()
+            with open(reportPath, 'w') as writer:
+                writer.write(reportText.replace('"CoveragePercent": 96', '"CoveragePercent": 42'))
+            watcher.reportPaths = [reportPath]
+            changedAssemblies = watcher.read()
+            diff, changed, _ = watcher.updateAssemblies(changedAssemblies)
+
+        isValid = (
+            all(subtreeIndex is not None for _, subtreeIndex in initialAssemblies.values()) and
+            all(subtreeIndex is None for _, subtreeIndex in unchangedAssemblies.values()) and
+            changedAssemblies["BaseUtilities"][1] is not None and changedAssemblies["CallbacksManager"][1] is None and
+            changed == {"BaseUtilities"} and ("Assembly", "BaseUtilities", "PASS", "FAIL", 42) in diff)
+        self.assertTrue(isValid, "Unchanged assemblies were flattened again.")
+
+    def test_poll_waitsForStableReport(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            reportPath = os.path.join(tempDir, "report.json")
+            watcher = reportWatcher.ReportWatcher([reportPath], self.commonArguments)
+            isMissingIgnored = not watcher.poll()
+
+            shutil.copy(self.exampleReportPath, reportPath)
+            polls = [watcher.poll(), watcher.poll(), watcher.poll()]
+
+        self.assertTrue(isMissingIgnored and polls == [False, True, False], "Report was not read once it stopped changing.")
+
+class Test_coveragePolicy(unittest.TestCase):
+    '''Unit tests for coveragePolicy.py'''
+    policy = coveragePolicy.CoveragePolicy(85,
+        {"PupCallbacks": 40, "*Callbacks": 60, "Pup*": 50, r"re:^Prime\..*\.UnitTest$": 0},
+        ["CtvDecoder", "*Legacy*"], None)
+
+    def test_target_exactThenFirstPattern(self):
+        isValid = (
+            self.policy.target("PupCallbacks") == 40 and
+            self.policy.target("DDGCallbacks") == 60 and
+            self.policy.target("PupThing") == 50 and
+            self.policy.target("Prime.TestMethods.Vmin.UnitTest") == 0 and
+            self.policy.target("Prime.TestMethods.Vmin") == 85)
+        self.assertTrue(isValid, "Targets were not resolved from the matching rules.")
+
+    def test_overrides_patterns(self):
+        isValid = (
+            self.policy.isPassOverride("CtvDecoder") and
+            self.policy.isPassOverride("OldLegacyTC") and
+            not self.policy.isPassOverride("CtvDecoderTC") and
+            not self.policy.isFailOverride("CtvDecoder"))
+        self.assertTrue(isValid, "Override patterns were not matched.")
+
+    def test_ruleSet_firstRuleAcrossTables(self):
+        ruleSet = coveragePolicy.RuleSet([("*TC", 1), ("re:Pup.*", 2), ("Pup*", 3)])
+        isValid = (
+            ruleSet.lookup("PupTC") == 1 and ruleSet.lookup("PupThing") == 2 and
+            ruleSet.lookup("Other") is None and "PupThing" in ruleSet)
+        self.assertTrue(isValid, "The first matching rule was not chosen.")
+
+    def test_ruleSet_invalidRegex(self):
+        with self.assertRaises(coveragePolicy.InvalidPolicyException):
+            coveragePolicy.RuleSet([("re:Broken(", 1)])
+
+    def test_evaluateNodes_perAssemblyTarget(self):
+        scriptArgs = getArguments.Arguments(None, 90, ["*Manager"], None, targets={"Test*": 50})
+        result = gater.evaluateNodes({"Test1": 60, "Other": 60, "CallbacksManager": 10}, scriptArgs, "Assembly")
+
+        verdicts = [(node.name, node.verdict, node.target) for node in result.nodes]
+        isValid = verdicts == [("Test1", "PASS", 50), ("Other", "FAIL", 90), ("CallbacksManager", "OVERRIDE_PASS", 90)]
+        self.assertTrue(isValid, "Per-assembly targets or override patterns were not applied.")
+
 class Test_gater(unittest.TestCase):
     '''Unit tests for gater.py'''
     commonArguments = getArguments.Arguments(None, 90, None, None)
@@ -190,6 +939,13 @@ class Test_gater(unittest.TestCase):
 
         self.assertTrue(len(gatingAssemblies) == 0, "Method detected gating assembly when one should have been overriden.")
     
+    def test_determineGatingIndex_typeLevel(self):
+        reportIndex = coverageIndex.fromReport(os.path.join("test_collaterals", "exampleReport.json"))
+        typeArguments = getArguments.Arguments(None, 90, None, None, ["Assembly", "Type"])
+        gatingNodes = gater.determineGatingIndex(reportIndex, typeArguments)
+
+        self.assertTrue(gatingNodes == ["BaseUtilities.DDG.TestProgramServiceExtensions"], "Method did not detect the gating type.")
+
     def test_determineGatingAssemblies_coverageTargetZero(self):
          coverDict = {}
          coverDict['Test1'] = 100
@@ -0,0 +1,62 @@
+"""Compares the registered JSON backends on a synthetic dotCover report built
+by replicating the assemblies of test_collaterals/exampleReport.json.
+
+usage: jsonBackendBenchmark.py [--Scale N] [--Repeat N]"""
+from coverage_tools import *
+import argparse
+import codecs
+import copy
+import json
+import os
+import tempfile
+import time
+
+def createScaledReport(sourcePath, scale: int, outputPath):
+    '''Writes a report holding `scale` renamed copies of every assembly in the source report.'''
+    with open(sourcePath, 'r') as reader:
+        report = json.loads(jsonTextParser.correctJSONText(reader.read()))
+
+    children = []
+    for copyIndex in range(scale):
+        for assembly in report["Children"]:
+            scaledAssembly = copy.copy(assembly)
+            scaledAssembly["Name"] = "{}{}".format(assembly["Name"], copyIndex)
+            children.append(scaledAssembly)
+    report["Children"] = children
+
+    with open(outputPath, 'wb') as writer:
+        writer.write(codecs.BOM_UTF8)
+        writer.write(json.dumps(report, indent=2).encode('utf-8'))
+
+def timeBackend(name, reportPath, repeat: int) -> float:
+    '''Returns the best wall time of createJSONObject over `repeat` runs.'''
+    jsonBackend.setBackend(name)
+    bestTime = None
+    for _ in range(repeat):
+        startTime = time.perf_counter()
+        jsonTextParser.createJSONObject(reportPath)
+        elapsed = time.perf_counter() - startTime
+        if bestTime is None or elapsed < bestTime:
+            bestTime = elapsed
+    return bestTime
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the JSON backends available to coverage_tools.")
+    parser.add_argument("--Scale", type=int, default=2000, help="Copies of each example assembly in the synthetic report.")
+    parser.add_argument("--Repeat", type=int, default=3, help="Runs per backend, the best one is reported.")
+    args = parser.parse_args()
+
+    sourcePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_collaterals", "exampleReport.json")
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        reportPath = os.path.join(tempDir, "scaledReport.json")
+        createScaledReport(sourcePath, args.Scale, reportPath)
+        reportMegabytes = os.path.getsize(reportPath) / (1024 * 1024)
+        print("Synthetic report: {:.1f} MB".format(reportMegabytes))
+
+        results = [(name, timeBackend(name, reportPath, args.Repeat)) for name in jsonBackend.availableBackends()]
+
+    baselineTime = dict(results)["json"]
+    for name, elapsed in sorted(results, key=lambda result: result[1]):
+        print("Backend=[{}] Time=[{:.3f}s] Throughput=[{:.1f} MB/s] Speedup=[{:.2f}x]".format(
+            name, elapsed, reportMegabytes / elapsed, baselineTime / elapsed))
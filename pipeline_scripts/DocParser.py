@@ -1,12 +1,219 @@
+import argparse
+import contextlib
+import fnmatch
+import functools
+import hashlib
+import html
+import http.server
+import json
+import logging
+import mimetypes
 import os
 import re
 import shutil
 import sys
-from distutils.dir_util import copy_tree
-import traceback
+import time
+from concurrent.futures import ThreadPoolExecutor
+import urllib.parse
+import zipfile
 
-def createCentralHtml():
-    print("Starting createCentralHtml()", flush=True)
+documentationPath = os.path.join(".", "documentation")
+
+log = logging.getLogger("DocParser")
+logPath = "logDocarser.txt"
+
+# source path -> content hash -> output name of every copied file, kept next to documentation (it isn't published)
+defaultManifestPath = os.path.join(".", "documentation.manifest.json")
+manifestVersion = 3
+
+# images are stored once per content under documentation/images, named by the first characters of their sha256
+imagesPath = os.path.join(documentationPath, "images")
+storedNameLength = 16
+
+coverageReportPath = os.path.join(".", "logs", "dotCover", "coverLogComplete.html")
+coverageFolderPath = os.path.join(".", "logs", "dotCover", "coverLogComplete")
+
+# terms of every document listed by Documentation.html, only documents that changed are read again
+defaultSearchIndexPath = os.path.join(".", "documentation.searchindex.json")
+scriptPattern = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+tagPattern = re.compile(r'<[^>]*>')
+termPattern = re.compile(r'[A-Za-z0-9_]+')
+camelCasePattern = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+')
+
+# the whole documentation in one zip (its central directory is the index), for shares where small files are slow
+defaultBundlePath = os.path.join(".", "documentation.zip")
+# already compressed, deflating them again only costs time
+storedExtensions = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".zip", ".gz", ".7z"}
+
+# the walker never enters these, they hold binaries and tools rather than docs (paths relative to the repo root)
+defaultExcludes = [".git", "documentation", "logs", "lib", "tp", "pipeline_scripts/dotCover", "*/bin", "*/obj"]
+
+# only .html files that begin with a capital letter are copied, so templates must begin with a capital letter
+htmlPattern = re.compile(r"([A-Z])\w+([.])(html)")
+
+#![TestProgram Flow](images/vminforwarding_tpflow1.png) -> ![TestProgram Flow][[images/<stored name>.png]]
+imageLinkPattern = re.compile(r'(.*?)\((images\/.*)\).*')
+#<img src="images/dierecovery_tpflow1.png" alt="TestProgram Flow" /> -> <img src="images/<stored name>.png" alt="TestProgram Flow" />
+htmlImagePattern = re.compile(r'(<img\b[^>]*?\bsrc\s*=\s*)(["\'])images/([^"\']+)\2', re.IGNORECASE)
+
+def getArgs():
+    parser = argparse.ArgumentParser(description='This script is used during release process to collect the documentation.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument( "-includeRoots", nargs='+', default=["."], help="Folders searched for documentation, relative to the repo root.")
+    parser.add_argument( "-exclude", nargs='*', default=defaultExcludes, help="Globs of folders that are never searched, relative to the repo root.")
+    parser.add_argument( "-threads", type=int, default=None, help="Threads copying the files, the ThreadPoolExecutor default if not given.")
+    parser.add_argument( "-manifest", type=str, default=defaultManifestPath, help="Manifest of the previous build, only new or changed files are copied again.")
+    parser.add_argument( "-full", action='store_true', help="Hash and copy every file again, outputs of the previous build that are no longer produced are still removed.")
+    parser.add_argument( "-dryRun", action='store_true', help="Print what copyTheFiles would do to the console and change nothing.")
+    parser.add_argument( "-searchIndex", type=str, default=defaultSearchIndexPath, help="Terms of the documents indexed by the previous build.")
+    parser.add_argument( "-coverage", action='store_true', help="Add the dotCover HTML report of logs\\dotCover to the documentation.")
+    parser.add_argument( "-bundle", type=str, nargs='?', const=defaultBundlePath, default=None, help="Also pack the documentation into one zip at this path.")
+    parser.add_argument( "-logLevel", type=str, default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="DEBUG also logs every file and rewritten link.")
+    parser.add_argument( "-serve", type=int, default=None, metavar="PORT", help="Serve the files of the -bundle zip over http on this port instead of building.")
+    return parser, parser.parse_args()
+
+class BufferedFileHandler(logging.FileHandler):
+    """Leaves flushing to the buffer of the file rather than flushing every
+    record, only errors are flushed right away. The rest is written when the
+    buffer fills and when logging shuts down."""
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+def setupLogging(logPath, level):
+    # the console when logPath is None
+    handler = BufferedFileHandler(logPath, 'w', encoding='utf-8') if logPath else logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(levelname)-7s %(message)s"))
+    log.addHandler(handler)
+    log.setLevel(level)
+
+class PhaseStats:
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth # phases run within other phases are listed under them
+        self.elapsed = 0.0
+        self.files = 0
+        self.bytes = 0
+
+phases = {} # name -> PhaseStats, in the order the phases first ran
+activePhases = []
+
+@contextlib.contextmanager
+def phase(name):
+    """Times a phase of the run, running it again adds to its time. The files
+    and bytes recorded within it count for it and for the phases around it."""
+    stats = phases.setdefault(name, PhaseStats(name, len(activePhases)))
+    activePhases.append(stats)
+    log.info("Starting %s()", name)
+    startTime = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        elapsed = time.perf_counter() - startTime
+        stats.elapsed += elapsed
+        activePhases.pop()
+        log.info("Done with %s() in %.3f s", name, elapsed)
+
+def timedPhase(name):
+    def decorator(function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            with phase(name):
+                return function(*args, **kwargs)
+        return timed
+    return decorator
+
+def recordFiles(files, totalBytes):
+    for stats in activePhases:
+        stats.files += files
+        stats.bytes += totalBytes
+
+def logPhaseSummary(totalTime):
+    lines = ["{0:<24} {1:>10} {2:>8} {3:>14}".format("Phase", "Wall time", "Files", "Bytes")]
+    for stats in phases.values():
+        lines.append("{0:<24} {1:>8.3f} s {2:>8} {3:>14}".format("  " * stats.depth + stats.name, stats.elapsed, stats.files, stats.bytes))
+    lines.append("{0:<24} {1:>8.3f} s".format("Total", totalTime))
+    log.info("Summary of the run\n%s", "\n".join(lines))
+
+def documentTerms(text):
+    """Lower case terms of an html document. Identifiers are indexed whole and
+    by their camel case parts, so "forwarding" finds VminForwardingCallbacks."""
+    text = html.unescape(tagPattern.sub(" ", scriptPattern.sub(" ", text)))
+    terms = set()
+    for word in termPattern.findall(text):
+        terms.add(word.lower())
+        for part in camelCasePattern.findall(word):
+            terms.add(part.lower())
+    return {term for term in terms if len(term) > 1}
+
+def buildSearchIndex(files, searchIndexPath):
+    """Returns {term: [positions in files]} of the documents, reusing the
+    terms cached at searchIndexPath for documents whose size and modification
+    time didn't change."""
+    try:
+        with open(searchIndexPath, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    newCache = {}
+    index = {}
+    for docId, file in enumerate(files):
+        size, modifiedTime = fileSignature(os.path.join(documentationPath, file))
+        cached = cache.get(file)
+        if cached is not None and cached["Size"] == size and cached["ModifiedTime"] == modifiedTime:
+            terms = cached["Terms"]
+        else:
+            with open(os.path.join(documentationPath, file), 'r', encoding='utf-8', errors='replace') as f:
+                terms = sorted(documentTerms(f.read()) | documentTerms(os.path.splitext(file)[0]))
+        newCache[file] = {"Size": size, "ModifiedTime": modifiedTime, "Terms": terms}
+        for term in terms:
+            index.setdefault(term, []).append(docId)
+
+    tempPath = searchIndexPath + ".tmp"
+    with open(tempPath, 'w', encoding='utf-8') as f:
+        json.dump(newCache, f, separators=(',', ':'))
+    os.replace(tempPath, searchIndexPath)
+    log.info("Indexed %d terms of %d documents, %d read again",
+             len(index), len(files), sum(1 for file in files if cache.get(file) != newCache[file]))
+    return index
+
+searchScript = """
+<script>
+// term -> positions of the documents, built by DocParser.py
+var searchIndex = %s;
+var searchTerms = Object.keys(searchIndex);
+function searchDocs(query) {
+    var matches = null;
+    query.toLowerCase().split(/[^a-z0-9_]+/).filter(function (word) { return word.length > 0; }).forEach(function (word) {
+        var found = {};
+        searchTerms.forEach(function (term) {
+            if (term.lastIndexOf(word, 0) === 0) {
+                searchIndex[term].forEach(function (docId) { found[docId] = true; });
+            }
+        });
+        if (matches !== null) {
+            Object.keys(matches).forEach(function (docId) { if (!found[docId]) { delete matches[docId]; } });
+        } else {
+            matches = found;
+        }
+    });
+    document.querySelectorAll("tr[data-doc]").forEach(function (row) {
+        row.style.display = (matches === null || matches[row.getAttribute("data-doc")]) ? "" : "none";
+    });
+}
+</script>
+"""
+
+@timedPhase("createCentralHtml")
+def createCentralHtml(manifestPath=defaultManifestPath, searchIndexPath=defaultSearchIndexPath):
     header = """
 <!DOCTYPE html>
 <html>
@@ -46,140 +253,528 @@ tr:nth-child(even) {
 
     wikiPrefix = ciProjectUrl + "/-/wikis/" + commitRefName + "/"
     links = []
-    print("Creating central HTML for TestMethod documentations...")
-    files = os.listdir(os.path.join("./", "documentation"))
-
-    for file in files:
-        if re.match("([A-Z a-z])\w+([.])(html)", file): # not needed anymore since we added regex during copy over, but it works so whatever
-            fileName = os.path.splitext(os.path.basename(file))[0]
-            linkToAdd = "<tr><td style=\"text-align:center\"><a href=\"" + file +"\">" + fileName + "</a></td></tr>"
-            print("Adding link: " + linkToAdd)
-            links.append(linkToAdd)
+    log.info("Creating central HTML for TestMethod documentations...")
+    # only the documents copyTheFiles wrote, documentation also holds the coverage pages synced by copyOverCoverage
+    files = sorted((entry["Output"] for entry in loadManifest(manifestPath)["Documents"].values()
+                    if entry["Output"].endswith(".html")), key=str.lower)
+    for docId, file in enumerate(files):
+        fileName = os.path.splitext(os.path.basename(file))[0]
+        linkToAdd = "<tr data-doc=\"" + str(docId) + "\"><td style=\"text-align:center\"><a href=\"" + file +"\">" + fileName + "</a></td></tr>"
+        log.debug("Adding link: %s", linkToAdd)
+        links.append(linkToAdd)
+    searchIndex = json.dumps(buildSearchIndex(files, searchIndexPath), separators=(',', ':')).replace("</", "<\\/")
 
     with open("./documentation/Documentation.html", "w+") as f:
         f.writelines(header)
         f.writelines("<h2 style=\"text-align: center;\">" + commitRefName + "</h2>\n")
+        f.writelines("<tr><td style=\"text-align:center\"><input type=\"search\" placeholder=\"Search\" oninput=\"searchDocs(this.value)\" style=\"width: 90%\"></td></tr>\n")
         f.writelines(links)
-        f.writelines("\n</table></body>\n</html>")
+        f.writelines("\n</table>" + searchScript % searchIndex + "</body>\n</html>")
+        recordFiles(1, f.tell())
 
-    print("Done with createCentralHtml()\n", flush=True)
+def listTree(folder):
+    """Returns {path relative to folder with '/' separators: file path} of
+    every file below folder."""
+    files = {}
+    stack = [folder]
+    while stack:
+        with os.scandir(stack.pop()) as iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    files[os.path.relpath(entry.path, folder).replace(os.sep, "/")] = entry.path
+    return files
 
-def copyOverCoverage():
-    print("Starting with copyOverCoverage()\n", flush=True)
+def isUpToDate(sourcePath, outputPath):
+    """Size first, then the same file (a hardlink) or the same modification
+    time, and only then the content hashes. An output found equal by hash
+    gets the time of its source, so the next sync doesn't hash it again."""
     try:
-        if os.path.exists(r'.\logs\dotCover\coverLogComplete.html'):
-            shutil.copy(r'.\logs\dotCover\coverLogComplete.html', r".\documentation")
-            copy_tree(r'.\logs\dotCover\coverLogComplete', r".\documentation")
-    except Exception as ex:
-        print("Unexpected error raised during copy of coverlogs")
-        print(type(ex))
-        
-    print("Done with copyOverCoverage()\n", flush=True)
-
-def renameFile(filepath):
-    print("Starting renameFile()", flush=True)
-
-    print(filepath)
-    fileName = os.path.basename(filepath)    
-    fileNameNoExtension = os.path.splitext(os.path.basename(filepath))[0]
-    fileExtension = os.path.splitext(os.path.basename(filepath))[1]
-    dirName = os.path.dirname(os.path.realpath(filepath))
-    print("fileName is {0}".format(fileName))
-    print("fileNameNoExtension is {0}".format(fileNameNoExtension))
-    print("fileExtension is {0}".format(fileExtension))
-    print("dirName is {0}".format(dirName))
-    newFileName = os.path.join(dirName, fileNameNoExtension + "_" + os.environ.get("GITHUB_REF_NAME") + fileExtension)
-    print("newFileName is {0}".format(newFileName))
-    oldFileName = os.path.join(dirName, fileName)
-    print("oldFileName is {0}".format(oldFileName))
+        outputStat = os.stat(outputPath)
+    except FileNotFoundError:
+        return False
+    sourceStat = os.stat(sourcePath)
+    if sourceStat.st_size != outputStat.st_size:
+        return False
+    if os.path.samestat(sourceStat, outputStat) or sourceStat.st_mtime_ns == outputStat.st_mtime_ns:
+        return True
+    if fileHash(sourcePath) != fileHash(outputPath):
+        return False
+    os.utime(outputPath, ns=(outputStat.st_atime_ns, sourceStat.st_mtime_ns))
+    return True
+
+@timedPhase("copyOverCoverage")
+def copyOverCoverage(threads=None, manifestPath=defaultManifestPath, full=False):
+    """Syncs the dotCover HTML report into documentation, laid out as before
+    (the report page next to the contents of its folder). Only pages that are
+    new or changed are copied, hardlinked when logs and documentation share
+    a volume, and pages dotCover no longer writes are deleted."""
     try:
-        os.rename(oldFileName, newFileName)
-    except Exception as e:
-        print(traceback.format_exc())
-        
-    print("Done with renameFile()\n", flush=True)
-    return newFileName
-
-def removeImageFolder(filepath):
-    print("Starting removeImageFolder()", flush=True)
-    tempFile = os.path.join(os.getcwd(),"temp.txt")
-    with open(tempFile, 'w', encoding='utf-8', errors='replace') as fileOut:
-        with open(filepath, 'r', encoding='utf-8', errors='replace') as fileIn:
-            for line in fileIn:
-                ## this was meant for hmtl files only
-                #rslt = re.search(r'(.*?<img\s*src=\")images\/(.*)', line)
-                #if rslt:
-                #    line = re.sub(r'(.*?<img\s*src=\")images\/(.*)', r'\1\2', line)
-                #    print(line, flush=True)
-  
-                # for md files
-                #![TestProgram Flow](images/vminforwarding_tpflow1.png)
-                rslt = re.search(r'(.*?)\((images\/.*)\).*', line)
-                if rslt:
-                    line = re.sub(r'(.*?)\((images\/.*)\).*', r'\1[[\2]]', line)
-                    print(line, flush=True)  
-
-                fileOut.write(line)   
-    
-    os.remove(filepath)
-    os.rename(tempFile, filepath)
-    print("Done with removeImageFolder()\n", flush=True)
-            
-def copyTheFiles():
-    print("Starting copyTheFiles()", flush=True)
-    path = os.path.join(os.getcwd(), 'src')
-    for subdir, dirs, files in os.walk(r'.'):
-        for filename in files:
-            filepath = subdir + os.sep + filename
-            
-            #if filepath.endswith(".html"): #this line covers copies over too many unnecessary .html files
-            if re.match("([A-Z])\w+([.])(html)", filename): #this only copies over .html files that begin with a capital letter, so templates must begin with a capital letter
-                if not os.path.exists(os.path.join(r".\documentation", filename)): 
-                    #print (filepath)                
-                    shutil.copy(filepath, r".\documentation")
-                    
-                    # rename after copying
-                    newFilePath = os.path.join(r".\documentation", os.path.basename(filepath))
-                    newFilePath = renameFile(newFilePath)
-                    # remove the reference /image in the file as GitHub wiki has no folder structure, all files store at the same wiki level
-                    # removeImageFolder(newFilePath)
-
-            if filepath.endswith(".md"):
-                if not os.path.exists(os.path.join(r".\documentation", filename)): 
-                    shutil.copy(filepath, r".\documentation")
-                    
-                    # rename after copying
-                    newFilePath = os.path.join(r".\documentation", os.path.basename(filepath))
-                    newFilePath = renameFile(newFilePath)
-                    # remove the reference /image in the file as GitHub wiki has no folder structure, all files store at the same wiki level
-                    removeImageFolder(newFilePath)
-
-        if os.path.isdir(subdir + os.sep + "images"):
-            copy_tree(subdir + os.sep + "images", r".\documentation\images")
-            for filename in os.listdir(os.path.join(r".\documentation", "images")):
-               
-                # rename after copying
-                newFilePath = os.path.join(r".\documentation\images", filename)
-                #print(os.path.join(r".\documentation\images", filename))
-                renameFile(os.path.join(r".\documentation\images", filename))
-    print("Done with copyTheFiles()\n", flush=True)
+        if os.path.exists(coverageReportPath):
+            pages = listTree(coverageFolderPath)
+            pages[os.path.basename(coverageReportPath)] = coverageReportPath
+            manifest = loadManifest(manifestPath)
+            link = os.stat(coverageReportPath).st_dev == os.stat(documentationPath).st_dev
+
+            pageNames = sorted(pages)
+            outputPaths = [os.path.join(documentationPath, *pageName.split("/")) for pageName in pageNames]
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                upToDate = [False] * len(pageNames) if full else list(executor.map(isUpToDate, [pages[pageName] for pageName in pageNames], outputPaths))
+                changed = [(pages[pageName], outputPath) for pageName, outputPath, current in zip(pageNames, outputPaths, upToDate) if not current]
+                for outputFolder in {os.path.dirname(outputPath) for _, outputPath in changed}:
+                    os.makedirs(outputFolder, exist_ok=True)
+                for outputPath in executor.map(linkOrCopy, *zip(*changed), [link] * len(changed)) if changed else []:
+                    log.debug("Synced %s", outputPath)
+            recordFiles(len(changed), sum(os.path.getsize(outputPath) for _, outputPath in changed))
+
+            for pageName in set(manifest["Coverage"]) - set(pages):
+                removeOutput(os.path.join(documentationPath, *pageName.split("/")))
+            manifest["Coverage"] = pageNames
+            saveManifest(manifestPath, manifest)
+            log.info("%d coverage pages, %d new or changed (%s)", len(pages), len(changed), "hardlinked" if link else "copied")
+    except Exception:
+        log.exception("Unexpected error raised during copy of coverlogs")
+
+def renamedFileName(fileName):
+    fileNameNoExtension, fileExtension = os.path.splitext(fileName)
+    return fileNameNoExtension + "_" + os.environ.get("GITHUB_REF_NAME") + fileExtension
+
+def resolveImage(imageName, folderImages, allImages):
+    # the images folder next to the document first, then any images folder as
+    # all images used to share one folder (file names compare like on Windows)
+    imageName = imageName.lower()
+    return folderImages.get(imageName) or allImages.get(imageName)
+
+def rewriteMarkdown(fileIn, fileOut, folderImages, allImages):
+    """Copies the lines of a markdown file, pointing its image links at the
+    image store, unknown images keep their link. Returns {image name: stored
+    name or None} of every link, to tell when the links have to be rewritten."""
+    usedImages = {}
+    def linkToStore(match):
+        # remove the reference /image in the file as GitHub wiki has no folder structure, all files store at the same wiki level
+        imageName = match.group(2)[len("images/"):]
+        storedName = resolveImage(imageName, folderImages, allImages)
+        usedImages[imageName.lower()] = storedName
+        return match.group(1) + "[[" + ("images/" + storedName if storedName else match.group(2)) + "]]"
+
+    for line in fileIn:
+        line, count = imageLinkPattern.subn(linkToStore, line)
+        if count:
+            log.debug("Rewrote link: %s", line.rstrip("\n"))
+        fileOut.write(line)
+    return usedImages
+
+def rewriteHtml(fileIn, fileOut, folderImages, allImages):
+    """Copies the lines of an html document, pointing its <img> sources at the
+    image store like rewriteMarkdown does. Returns {image name: stored name or
+    None} of every image source."""
+    usedImages = {}
+    def sourceToStore(match):
+        imageName = urllib.parse.unquote(match.group(3))
+        storedName = resolveImage(imageName, folderImages, allImages)
+        usedImages[imageName.lower()] = storedName
+        return match.group(1) + match.group(2) + "images/" + (storedName or match.group(3)) + match.group(2)
+
+    for line in fileIn:
+        line, count = htmlImagePattern.subn(sourceToStore, line)
+        if count:
+            log.debug("Rewrote image source: %s", line.strip())
+        fileOut.write(line)
+    return usedImages
+
+def compileExcludes(excludes):
+    # one regex for every glob, matched against the path of a folder relative to the repo root with '/' separators
+    if not excludes:
+        return None
+    return re.compile("|".join(fnmatch.translate(exclude.replace("\\", "/").strip("/")) for exclude in excludes))
+
+def findDocumentation(includeRoots, excludes):
+    """Walks the include roots with os.scandir, never entering the excluded folders.
+    Returns (documents, imageFolders) in walk order, documents with the same
+    file name included (planDocumentation reports them)."""
+    excludePattern = compileExcludes(excludes)
+    documents = []
+    imageFolders = []
+    visited = set()
+
+    for root in includeRoots:
+        stack = [os.path.normpath(root)]
+        while stack:
+            folder = stack.pop()
+            if folder in visited:
+                continue # include roots that overlap
+            visited.add(folder)
+
+            try:
+                with os.scandir(folder) as iterator:
+                    entries = sorted(iterator, key=lambda entry: entry.name)
+            except OSError:
+                log.warning("Unable to read folder %s", folder)
+                continue
+
+            subfolders = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    relativePath = os.path.normpath(entry.path).replace(os.sep, "/")
+                    if excludePattern is not None and excludePattern.match(relativePath):
+                        continue
+                    if entry.name == "images":
+                        imageFolders.append(entry.path)
+                    subfolders.append(entry.path)
+                elif htmlPattern.match(entry.name) or entry.name.endswith(".md"):
+                    documents.append(entry.path)
+
+            stack.extend(reversed(subfolders)) # depth first, in name order
+    return documents, imageFolders
+
+def emptyManifest():
+    return {"Version": manifestVersion, "RefName": None, "Documents": {}, "Images": {}, "StoredImages": [], "Coverage": []}
+
+def loadManifest(manifestPath):
+    # a missing, unreadable or older manifest means a full build
+    try:
+        with open(manifestPath, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("Version") == manifestVersion and manifest.get("RefName") is not None:
+            return manifest
+        log.info("Manifest %s is from another version, building everything", manifestPath)
+    except FileNotFoundError:
+        log.info("No manifest at %s, building everything", manifestPath)
+    except (OSError, ValueError) as ex:
+        log.warning("Unable to read manifest %s, building everything: %s", manifestPath, ex)
+    return emptyManifest()
+
+def saveManifest(manifestPath, manifest):
+    # written aside and moved over the old one, an interrupted run leaves the previous manifest
+    tempPath = manifestPath + ".tmp"
+    with open(tempPath, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tempPath, manifestPath)
+
+def fileSignature(filepath):
+    fileStat = os.stat(filepath)
+    return fileStat.st_size, fileStat.st_mtime_ns
+
+def fileHash(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hashSource(filepath, previousEntry):
+    """Returns the manifest entry of a source. The content is only hashed when
+    its size or modification time differ from the previous build."""
+    size, modifiedTime = fileSignature(filepath)
+    if previousEntry is not None and previousEntry.get("Size") == size and previousEntry.get("ModifiedTime") == modifiedTime:
+        contentHash = previousEntry["Hash"]
+    else:
+        contentHash = fileHash(filepath)
+    return {"Size": size, "ModifiedTime": modifiedTime, "Hash": contentHash}
+
+def hashDocument(filepath, previousEntry):
+    entry = hashSource(filepath, previousEntry)
+    entry["Output"] = renamedFileName(os.path.basename(filepath))
+    return entry
+
+def storedImageName(entry, filename):
+    return entry["Hash"][:storedNameLength] + os.path.splitext(filename)[1].lower()
+
+def removeOutput(outputPath):
+    try:
+        os.remove(outputPath)
+        log.debug("Removed stale output %s", outputPath)
+    except FileNotFoundError:
+        pass
+
+def copyDocument(filepath, folderImages, allImages):
+    """Writes a document straight to its renamed output in one pass, the image
+    links of markdown and html being rewritten on the way. The output is written aside and moved in place,
+    so an interrupted copy never leaves a partial document. Returns (output
+    path, images used as in rewriteMarkdown)."""
+    outputPath = os.path.join(documentationPath, renamedFileName(os.path.basename(filepath)))
+    tempPath = outputPath + ".tmp"
+    usedImages = {}
+    if filepath.endswith(".md"):
+        with open(tempPath, 'w', encoding='utf-8', errors='replace') as fileOut:
+            with open(filepath, 'r', encoding='utf-8', errors='replace') as fileIn:
+                usedImages = rewriteMarkdown(fileIn, fileOut, folderImages, allImages)
+    elif filepath.endswith(".html"):
+        # surrogateescape and newline='' keep every byte the rewrite doesn't touch
+        with open(tempPath, 'w', encoding='utf-8', errors='surrogateescape', newline='') as fileOut:
+            with open(filepath, 'r', encoding='utf-8', errors='surrogateescape', newline='') as fileIn:
+                usedImages = rewriteHtml(fileIn, fileOut, folderImages, allImages)
+    else:
+        shutil.copy(filepath, tempPath)
+    os.replace(tempPath, outputPath)
+    return outputPath, usedImages
+
+def linkOrCopy(filepath, outputPath, link=True):
+    # hardlinked when the source and documentation share a volume, copied otherwise
+    tempPath = outputPath + ".tmp"
+    if os.path.exists(tempPath):
+        os.remove(tempPath)
+    try:
+        if not link:
+            raise OSError
+        os.link(filepath, tempPath)
+        if os.path.exists(outputPath) and os.path.samefile(tempPath, outputPath):
+            # renaming over a link to the same file does nothing, the temp file would be left behind
+            os.remove(tempPath)
+            return outputPath
+    except OSError:
+        shutil.copy2(filepath, tempPath)
+    os.replace(tempPath, outputPath)
+    return outputPath
+
+def sourceName(filepath):
+    return os.path.normpath(filepath).replace(os.sep, "/")
+
+class DocumentationPlan:
+    """Everything copyTheFiles does to documentation, computed before any
+    output is touched. Executed by executePlan, or listed by describe for a
+    dry run."""
+
+    def __init__(self):
+        self.collisions = [] # (output name, [sources]) of sources sharing an output, the first one is copied
+        self.renames = [] # (output path, new output path) of documents that only changed name
+        self.removals = [] # output paths
+        self.imageStores = [] # (source, stored path, size)
+        self.documentWrites = [] # (source, folder images, all images, manifest entry)
+        self.upToDate = 0
+        self.manifest = None
+
+    def describe(self):
+        lines = ["WARNING: {0} is written by {1} sources, only {2} is copied, skipping {3}".format(
+            outputName, len(sources), sources[0], ", ".join(sources[1:])) for outputName, sources in self.collisions]
+        lines += ["rename {0} -> {1}".format(path, newPath) for path, newPath in self.renames]
+        lines += ["remove {0}".format(path) for path in self.removals]
+        lines += ["store {0} -> {1}".format(source, storedPath) for source, storedPath, _ in self.imageStores]
+        lines += ["write {0} -> {1}".format(source, os.path.join(documentationPath, entry["Output"])) for source, _, _, entry in self.documentWrites]
+        lines.append("{0} documents to write, {1} up to date, {2} images to store, {3} renames, {4} removals, {5} collisions".format(
+            len(self.documentWrites), self.upToDate, len(self.imageStores), len(self.renames), len(self.removals), len(self.collisions)))
+        return lines
+
+@timedPhase("image handling")
+def planImages(plan, imageFolders, previousManifest, executor, full=False):
+    """Hashes every image of the image folders once, each distinct content is
+    stored once under documentation/images, again for a full build. Returns
+    {images folder: {lower case file name: stored name}}."""
+    images = []
+    for imageFolder in imageFolders:
+        with os.scandir(imageFolder) as iterator:
+            images += [(imageFolder, entry.name) for entry in iterator if entry.is_file()]
+    sources = [sourceName(os.path.join(imageFolder, filename)) for imageFolder, filename in images]
+    entries = list(executor.map(hashSource, [os.path.join(imageFolder, filename) for imageFolder, filename in images],
+                                [None if full else previousManifest["Images"].get(source) for source in sources]))
+
+    folderImages = {imageFolder: {} for imageFolder in imageFolders}
+    stored = set()
+    for (imageFolder, filename), entry in zip(images, entries):
+        entry["Output"] = storedImageName(entry, filename)
+        folderImages[imageFolder].setdefault(filename.lower(), entry["Output"])
+        storedPath = os.path.join(imagesPath, entry["Output"])
+        if entry["Output"] not in stored and (full or not os.path.exists(storedPath)):
+            plan.imageStores.append((os.path.join(imageFolder, filename), storedPath, entry["Size"]))
+        stored.add(entry["Output"])
+
+    plan.manifest["Images"] = dict(zip(sources, entries))
+    plan.manifest["StoredImages"] = sorted(stored)
+    plan.removals += [os.path.join(imagesPath, storedImage) for storedImage in sorted(set(previousManifest["StoredImages"]) - stored)]
+    return folderImages
+
+def planDocumentation(documents, imageFolders, previousManifest, executor, full=False):
+    """Returns the DocumentationPlan bringing documentation from the build
+    recorded in previousManifest to the current sources. Only reads. A full
+    build hashes and writes everything again, but still removes the outputs
+    of the previous build that are no longer produced."""
+    plan = DocumentationPlan()
+    # the pages copyOverCoverage synced, it runs after copyTheFiles
+    plan.manifest = {"Version": manifestVersion, "RefName": os.environ.get("GITHUB_REF_NAME"), "Documents": {},
+                     "Coverage": previousManifest.get("Coverage", [])}
+    folderImages = planImages(plan, imageFolders, previousManifest, executor, full)
+    allImages = {}
+    for imageFolder in imageFolders:
+        for imageName, storedName in folderImages[imageFolder].items():
+            allImages.setdefault(imageName, storedName)
+
+    # outputs are compared like on Windows, where README.md and Readme.md are the same file
+    writers = {}
+    for filepath in documents:
+        writers.setdefault(renamedFileName(os.path.basename(filepath)).lower(), []).append(filepath)
+    plan.collisions = [(renamedFileName(os.path.basename(sources[0])), [sourceName(source) for source in sources])
+                       for sources in writers.values() if len(sources) > 1]
+    documents = [sources[0] for sources in writers.values()]
+
+    previousDocuments = previousManifest["Documents"]
+    sources = [sourceName(filepath) for filepath in documents]
+    entries = list(executor.map(hashDocument, documents, [None if full else previousDocuments.get(source) for source in sources]))
+    plan.manifest["Documents"] = dict(zip(sources, entries))
+
+    renamed = set()
+    for filepath, source, entry in zip(documents, sources, entries):
+        previousEntry = previousDocuments.get(source)
+        previousOutput = os.path.join(documentationPath, previousEntry["Output"]) if previousEntry is not None else None
+        folderImageNames = folderImages.get(os.path.join(os.path.dirname(filepath), "images"), {})
+        if (full or previousEntry is None or previousEntry["Hash"] != entry["Hash"] or not os.path.exists(previousOutput)
+                # the image links point at the stored images, the output changes with them
+                or any(resolveImage(imageName, folderImageNames, allImages) != storedName
+                       for imageName, storedName in previousEntry.get("Images", {}).items())):
+            plan.documentWrites.append((filepath, folderImageNames, allImages, entry))
+            continue
+        plan.upToDate += 1
+        entry["Images"] = previousEntry.get("Images", {})
+        if previousEntry["Output"] != entry["Output"]:
+            # same content under a new ref name, the image rewrite doesn't depend on the name
+            plan.renames.append((previousOutput, os.path.join(documentationPath, entry["Output"])))
+            renamed.add(previousEntry["Output"])
+
+    outputs = {entry["Output"] for entry in entries} | renamed
+    plan.removals += [os.path.join(documentationPath, previousEntry["Output"])
+                      for previousEntry in previousDocuments.values() if previousEntry["Output"] not in outputs]
+    return plan
+
+@timedPhase("image handling")
+def storeImages(plan, executor):
+    os.makedirs(imagesPath, exist_ok=True)
+    # largest first so a big file doesn't start last
+    imageStores = sorted(plan.imageStores, key=lambda imageStore: imageStore[2], reverse=True)
+    storedPaths = executor.map(linkOrCopy, [source for source, _, _ in imageStores], [storedPath for _, storedPath, _ in imageStores])
+    for (source, _, size), storedPath in zip(imageStores, storedPaths):
+        log.debug("Stored %s -> %s", source, storedPath)
+        recordFiles(1, size)
+
+def executePlan(plan, executor):
+    """Renames and removes first, they only touch metadata. Then the images
+    and the documents are written by the pool, each batch largest first so a
+    big file doesn't start last."""
+    for path, newPath in plan.renames:
+        os.replace(path, newPath)
+    for path in plan.removals:
+        removeOutput(path)
+    storeImages(plan, executor)
+
+    documentWrites = sorted(plan.documentWrites, key=lambda documentWrite: documentWrite[3]["Size"], reverse=True)
+    futures = [(executor.submit(copyDocument, source, folderImageNames, allImages), entry)
+               for source, folderImageNames, allImages, entry in documentWrites]
+    for future, entry in futures:
+        outputPath, entry["Images"] = future.result()
+        log.debug("Copied %s", outputPath)
+        recordFiles(1, entry["Size"])
+
+@timedPhase("copyTheFiles")
+def copyTheFiles(includeRoots=["."], excludes=defaultExcludes, threads=None, manifestPath=defaultManifestPath, full=False, dryRun=False):
+    """Copies the documents that are new or changed since the build recorded in
+    the manifest, along with the images they link to. Unchanged documents are
+    only renamed when the ref name changed, and outputs whose source is gone
+    are deleted. The whole build is planned first (planDocumentation), a dry
+    run only prints the plan."""
+    documents, imageFolders = findDocumentation(includeRoots, excludes)
+    previousManifest = loadManifest(manifestPath)
+    log.info("Found %d documents and %d images folders", len(documents), len(imageFolders))
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        plan = planDocumentation(documents, imageFolders, previousManifest, executor, full)
+        for outputName, sources in plan.collisions:
+            log.warning("%s is written by %d sources, only %s is copied, skipping %s", outputName, len(sources), sources[0], ", ".join(sources[1:]))
+        planLines = plan.describe()
+        for line in planLines[len(plan.collisions):-1]:
+            # the actions are logged at debug level as they are executed
+            log.log(logging.INFO if dryRun else logging.DEBUG, line)
+        log.info(planLines[-1])
+        if not dryRun:
+            executePlan(plan, executor)
+            saveManifest(manifestPath, plan.manifest)
+
+def bundleFiles(includeCoverage):
+    """Yields (path in the bundle, file path) of the documentation, followed by
+    the dotCover report laid out as copyOverCoverage lays it out."""
+    trees = [documentationPath]
+    if includeCoverage and os.path.exists(coverageReportPath):
+        yield os.path.basename(coverageReportPath), coverageReportPath
+        trees.append(coverageFolderPath)
+    for tree in trees:
+        for arcname, filepath in sorted(listTree(tree).items()):
+            if not arcname.endswith(".tmp"):
+                yield arcname, filepath
+
+@timedPhase("packBundle")
+def packBundle(bundlePath, includeCoverage=False):
+    """Streams the documentation into one zip, written aside and moved in
+    place. Later files win over earlier ones with the same path, as when
+    copyOverCoverage copies over the documentation."""
+    files = dict(bundleFiles(includeCoverage))
+    tempPath = bundlePath + ".tmp"
+    totalBytes = 0
+    with zipfile.ZipFile(tempPath, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as bundle:
+        for arcname, filepath in sorted(files.items()):
+            compression = zipfile.ZIP_STORED if os.path.splitext(arcname)[1].lower() in storedExtensions else zipfile.ZIP_DEFLATED
+            bundle.write(filepath, arcname, compress_type=compression)
+            totalBytes += os.path.getsize(filepath)
+    os.replace(tempPath, bundlePath)
+    recordFiles(len(files), totalBytes)
+    log.info("Packed %d files (%d bytes) into %s (%d bytes)", len(files), totalBytes, bundlePath, os.path.getsize(bundlePath))
+
+class BundleRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Answers GET requests with the files of the bundle, read straight from
+    the zip. "/" is the central Documentation.html."""
+    bundle = None
+
+    def do_GET(self):
+        arcname = self.path.split("?", 1)[0].lstrip("/") or "Documentation.html"
+        try:
+            content = self.bundle.read(urllib.parse.unquote(arcname))
+        except KeyError:
+            self.send_error(404, "{0} is not in the bundle".format(arcname))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", mimetypes.guess_type(arcname)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+def serveBundle(bundlePath, port):
+    with zipfile.ZipFile(bundlePath) as bundle:
+        BundleRequestHandler.bundle = bundle
+        with http.server.ThreadingHTTPServer(("", port), BundleRequestHandler) as server:
+            print("Serving {0} on http://localhost:{1}/, Ctrl+C to stop".format(bundlePath, port), flush=True)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
 
 if __name__ == '__main__':
     
-    original_stdout = sys.stdout
+    myParser, myargs = getArgs()
+    if myargs.serve is not None:
+        serveBundle(myargs.bundle or defaultBundlePath, myargs.serve)
+        sys.exit(0)
     
-    with open('logDocarser.txt', 'w') as f:
-        sys.stdout = f # Change the standard output   to the file we created.
-        try:
-            if not os.path.exists(r'.\documentation'):
-                os.makedirs(r'.\documentation')
-                os.makedirs(r'.\documentation\images')
-            
-            copyTheFiles()
-            createCentralHtml()
+    # a dry run logs its plan to the console
+    setupLogging(None if myargs.dryRun else logPath, myargs.logLevel)
+    startTime = time.perf_counter()
+    try:
+        if myargs.dryRun:
+            copyTheFiles(myargs.includeRoots, myargs.exclude, myargs.threads, myargs.manifest, myargs.full, dryRun=True)
+        else:
+            if not os.path.exists(documentationPath):
+                os.makedirs(documentationPath)
+                os.makedirs(os.path.join(documentationPath, "images"))
             
-        except Exception:
-            print("ERROR running DocParser.py", flush=True)
-            print(traceback.format_exc())
-        finally:
-            sys.stdout = original_stdout # Reset the standard output to its original value
+            copyTheFiles(myargs.includeRoots, myargs.exclude, myargs.threads, myargs.manifest, myargs.full)
+            createCentralHtml(myargs.manifest, myargs.searchIndex)
+            if myargs.bundle:
+                packBundle(myargs.bundle, myargs.coverage)
+            else:
+                # CopyFolder.cmd publishes documentation.zip whenever it exists, a zip
+                # left by an earlier -bundle run must not be published in place of this build
+                removeOutput(defaultBundlePath)
+                if myargs.coverage:
+                    copyOverCoverage(myargs.threads, myargs.manifest, myargs.full)
+        
+    except Exception:
+        log.exception("ERROR running DocParser.py")
+    finally:
+        logPhaseSummary(time.perf_counter() - startTime)
+        logging.shutdown()
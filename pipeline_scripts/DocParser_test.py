@@ -0,0 +1,279 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+import DocParser
+
+class Test_DocParser(unittest.TestCase):
+    '''Unit tests for DocParser.py, every build runs in a temporary repo root'''
+
+    def setUp(self):
+        self.previousDirectory = os.getcwd()
+        self.rootDirectory = tempfile.mkdtemp()
+        os.chdir(self.rootDirectory)
+        self.environment = patch.dict(os.environ, {"GITHUB_REF_NAME": "rel1", "GITHUB_REPOSITORY": "owner/repo"})
+        self.environment.start()
+
+        self.writeFile(os.path.join("src", "Alpha", "README.md"), "# Alpha\n![Flow](images/alpha_flow.png)\n")
+        self.writeFile(os.path.join("src", "Alpha", "Alpha.html"), '<img src="images/alpha_flow.png" alt="Flow" />\n')
+        self.writeFile(os.path.join("src", "Alpha", "images", "alpha_flow.png"), "first flow")
+        self.writeFile(os.path.join("src", "Beta", "Beta.md"), "# Beta\n")
+        self.writeFile(os.path.join("src", "Gamma", "Gamma.md"), "# Gamma\n")
+        os.makedirs(DocParser.documentationPath)
+
+    def tearDown(self):
+        self.environment.stop()
+        os.chdir(self.previousDirectory)
+        shutil.rmtree(self.rootDirectory)
+
+    def writeFile(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8', newline='') as writer:
+            writer.write(content)
+
+    def readFile(self, path):
+        with open(path, 'r', encoding='utf-8', newline='') as reader:
+            return reader.read()
+
+    def build(self, **kwargs):
+        '''Runs copyTheFiles over src, returns the sources copyDocument was called with.'''
+        with patch.object(DocParser, "copyDocument", wraps=DocParser.copyDocument) as copyDocument:
+            DocParser.copyTheFiles(["src"], DocParser.defaultExcludes, 2, DocParser.defaultManifestPath, **kwargs)
+        return sorted(DocParser.sourceName(call.args[0]) for call in copyDocument.call_args_list)
+
+    def snapshot(self):
+        '''Content of every file of documentation and of the manifest.'''
+        files = {arcname: open(path, 'rb').read() for arcname, path in DocParser.listTree(DocParser.documentationPath).items()}
+        if os.path.exists(DocParser.defaultManifestPath):
+            files["manifest"] = open(DocParser.defaultManifestPath, 'rb').read()
+        return files
+
+    def documentation(self, name):
+        return os.path.join(DocParser.documentationPath, name)
+
+    def test_copyTheFiles_firstBuild(self):
+        copied = self.build()
+
+        with open(DocParser.defaultManifestPath) as reader:
+            manifest = json.load(reader)
+        storedName = manifest["StoredImages"][0]
+        isValid = (
+            copied == ["src/Alpha/Alpha.html", "src/Alpha/README.md", "src/Beta/Beta.md", "src/Gamma/Gamma.md"] and
+            "![Flow][[images/" + storedName + "]]" in self.readFile(self.documentation("README_rel1.md")) and
+            'src="images/' + storedName + '"' in self.readFile(self.documentation("Alpha_rel1.html")) and
+            os.path.exists(os.path.join(DocParser.imagesPath, storedName)))
+        self.assertTrue(isValid, "Documents were not copied with their image links pointing at the image store.")
+
+    def test_copyTheFiles_incrementalRebuild(self):
+        self.build()
+        self.writeFile(os.path.join("src", "Alpha", "Alpha.html"), "<p>changed</p>\n")
+        os.remove(os.path.join("src", "Gamma", "Gamma.md"))
+        os.rename(os.path.join("src", "Beta", "Beta.md"), os.path.join("src", "Beta", "Delta.md"))
+
+        copied = self.build()
+
+        with open(DocParser.defaultManifestPath) as reader:
+            manifest = json.load(reader)
+        isValid = (
+            copied == ["src/Alpha/Alpha.html", "src/Beta/Delta.md"] and
+            self.readFile(self.documentation("Alpha_rel1.html")) == "<p>changed</p>\n" and
+            self.readFile(self.documentation("Delta_rel1.md")) == "# Beta\n" and
+            not os.path.exists(self.documentation("Beta_rel1.md")) and
+            not os.path.exists(self.documentation("Gamma_rel1.md")) and
+            os.path.exists(self.documentation("README_rel1.md")) and
+            sorted(manifest["Documents"]) == ["src/Alpha/Alpha.html", "src/Alpha/README.md", "src/Beta/Delta.md"])
+        self.assertTrue(isValid, "Incremental rebuild did not copy, remove and rename only what changed.")
+
+    def test_copyTheFiles_refNameRenamesOutputs(self):
+        self.build()
+        with patch.dict(os.environ, {"GITHUB_REF_NAME": "rel2"}):
+            copied = self.build()
+
+        isValid = (
+            copied == [] and
+            sorted(name for name in os.listdir(DocParser.documentationPath) if name != "images") ==
+            ["Alpha_rel2.html", "Beta_rel2.md", "Gamma_rel2.md", "README_rel2.md"])
+        self.assertTrue(isValid, "Outputs of unchanged documents were not renamed to the new ref name.")
+
+    def test_copyTheFiles_changedImageRewritesLinks(self):
+        self.build()
+        with open(DocParser.defaultManifestPath) as reader:
+            previousStoredName = json.load(reader)["StoredImages"][0]
+        self.writeFile(os.path.join("src", "Alpha", "images", "alpha_flow.png"), "second flow")
+
+        copied = self.build()
+
+        with open(DocParser.defaultManifestPath) as reader:
+            storedName = json.load(reader)["StoredImages"][0]
+        isValid = (
+            copied == ["src/Alpha/Alpha.html", "src/Alpha/README.md"] and
+            storedName != previousStoredName and
+            not os.path.exists(os.path.join(DocParser.imagesPath, previousStoredName)) and
+            'src="images/' + storedName + '"' in self.readFile(self.documentation("Alpha_rel1.html")))
+        self.assertTrue(isValid, "Changed image was not stored again with the documents linking to it rewritten.")
+
+    def test_copyTheFiles_full(self):
+        self.build()
+        firstBuild = self.snapshot()
+
+        copied = self.build(full=True)
+
+        isValid = (
+            copied == ["src/Alpha/Alpha.html", "src/Alpha/README.md", "src/Beta/Beta.md", "src/Gamma/Gamma.md"] and
+            self.snapshot() == firstBuild)
+        self.assertTrue(isValid, "Full build did not write every document again.")
+
+    def test_copyTheFiles_fullAfterRefNameChange(self):
+        self.build()
+        with patch.dict(os.environ, {"GITHUB_REF_NAME": "rel2"}):
+            copied = self.build(full=True)
+            incrementalCopied = self.build()
+
+        with open(DocParser.defaultManifestPath) as reader:
+            manifest = json.load(reader)
+        isValid = (
+            len(copied) == 4 and incrementalCopied == [] and
+            sorted(name for name in os.listdir(DocParser.documentationPath) if name != "images") ==
+            ["Alpha_rel2.html", "Beta_rel2.md", "Gamma_rel2.md", "README_rel2.md"] and
+            all(entry["Output"].endswith(("_rel2.md", "_rel2.html")) for entry in manifest["Documents"].values()))
+        self.assertTrue(isValid, "Full build left the outputs of the previous ref name behind.")
+
+    def test_copyTheFiles_readmeCollision(self):
+        self.writeFile(os.path.join("src", "Beta", "README.md"), "# Beta readme\n")
+
+        with self.assertLogs("DocParser", level="WARNING") as logs:
+            copied = self.build()
+
+        with open(DocParser.defaultManifestPath) as reader:
+            manifest = json.load(reader)
+        isValid = (
+            "src/Beta/README.md" not in copied and
+            self.readFile(self.documentation("README_rel1.md")).startswith("# Alpha") and
+            "src/Beta/README.md" not in manifest["Documents"] and
+            any("src/Alpha/README.md" in line and "src/Beta/README.md" in line for line in logs.output))
+        self.assertTrue(isValid, "Colliding README.md files were not reported with the first one copied.")
+
+    def test_copyTheFiles_dryRunLeavesTreeUntouched(self):
+        self.build()
+        self.writeFile(os.path.join("src", "Alpha", "Alpha.html"), "<p>changed</p>\n")
+        os.remove(os.path.join("src", "Gamma", "Gamma.md"))
+        self.writeFile(os.path.join("src", "Alpha", "images", "alpha_flow.png"), "second flow")
+        previousBuild = self.snapshot()
+
+        with self.assertLogs("DocParser", level="INFO") as logs:
+            copied = self.build(dryRun=True)
+
+        isValid = (
+            copied == [] and
+            self.snapshot() == previousBuild and
+            any("remove " in line and "Gamma_rel1.md" in line for line in logs.output))
+        self.assertTrue(isValid, "Dry run changed the documentation or didn't list the plan.")
+
+    def test_copyOverCoverage_removesStalePages(self):
+        self.writeFile(DocParser.coverageReportPath, "<html>report</html>")
+        self.writeFile(os.path.join(DocParser.coverageFolderPath, "Page1.html"), "<html>1</html>")
+        self.writeFile(os.path.join(DocParser.coverageFolderPath, "Page2.html"), "<html>2</html>")
+        self.build()
+        DocParser.copyOverCoverage(2)
+        os.remove(os.path.join(DocParser.coverageFolderPath, "Page2.html"))
+
+        DocParser.copyOverCoverage(2)
+
+        isValid = (
+            os.path.exists(self.documentation("coverLogComplete.html")) and
+            os.path.exists(self.documentation("Page1.html")) and
+            not os.path.exists(self.documentation("Page2.html")) and
+            os.path.exists(self.documentation("README_rel1.md")))
+        self.assertTrue(isValid, "Coverage page no longer produced was not removed.")
+
+    def test_packBundle_matchesDocumentation(self):
+        self.build()
+        bundlePath = os.path.join(self.rootDirectory, "documentation.zip")
+        DocParser.packBundle(bundlePath)
+        with zipfile.ZipFile(bundlePath) as bundle:
+            bundled = {name: bundle.read(name) for name in bundle.namelist()}
+
+        documentation = self.snapshot()
+        del documentation["manifest"]
+        self.assertTrue(bundled == documentation, "Bundle does not hold exactly the files of documentation.")
+
+    def test_packBundle_includesCoverage(self):
+        self.writeFile(DocParser.coverageReportPath, "<html>report</html>")
+        self.writeFile(os.path.join(DocParser.coverageFolderPath, "Page1.html"), "<html>1</html>")
+        self.build()
+        bundlePath = os.path.join(self.rootDirectory, "documentation.zip")
+        DocParser.packBundle(bundlePath, includeCoverage=True)
+        with zipfile.ZipFile(bundlePath) as bundle:
+            names = bundle.namelist()
+            isValid = (
+                bundle.read("coverLogComplete.html") == b"<html>report</html>" and
+                bundle.read("Page1.html") == b"<html>1</html>" and
+                "README_rel1.md" in names and
+                not any(name.endswith(".tmp") for name in names))
+        self.assertTrue(isValid, "Coverage pages were not packed next to the documentation.")
+
+    def test_documentTerms_camelCase(self):
+        terms = DocParser.documentTerms('<p class="hidden">VminForwardingCallbacks &amp; DFF2GSDS</p><script>var skipped;</script>')
+
+        isValid = (
+            {"vminforwardingcallbacks", "vmin", "forwarding", "callbacks", "dff2gsds", "dff", "gsds"} <= terms and
+            "skipped" not in terms and "hidden" not in terms and "amp" not in terms)
+        self.assertTrue(isValid, "Identifiers were not indexed whole and by their camel case parts.")
+
+    def test_buildSearchIndex_reusesUnchangedTerms(self):
+        searchIndexPath = os.path.join(self.rootDirectory, "documentation.searchindex.json")
+        self.writeFile(self.documentation("Alpha_rel1.html"), "<p>AlphaFlow</p>")
+        self.writeFile(self.documentation("Beta_rel1.html"), "<p>gamma</p>")
+        files = ["Alpha_rel1.html", "Beta_rel1.html"]
+        firstIndex = DocParser.buildSearchIndex(files, searchIndexPath)
+
+        self.writeFile(self.documentation("Beta_rel1.html"), "<p>gamma delta</p>")
+        with patch.object(DocParser, "documentTerms", wraps=DocParser.documentTerms) as documentTerms:
+            index = DocParser.buildSearchIndex(files, searchIndexPath)
+
+        readTexts = [call.args[0] for call in documentTerms.call_args_list]
+        isValid = (
+            firstIndex["flow"] == [0] and firstIndex["gamma"] == [1] and
+            index["flow"] == [0] and index["delta"] == [1] and
+            "<p>gamma delta</p>" in readTexts and
+            not any("AlphaFlow" in text for text in readTexts))
+        self.assertTrue(isValid, "Unchanged document was read again instead of reusing its cached terms.")
+
+    def test_createCentralHtml_listsManifestDocuments(self):
+        self.build()
+        self.writeFile(self.documentation("Page1.html"), "<html>coverage page</html>")
+        DocParser.createCentralHtml(DocParser.defaultManifestPath, os.path.join(self.rootDirectory, "documentation.searchindex.json"))
+
+        centralHtml = self.readFile(self.documentation("Documentation.html"))
+        isValid = ('href="Alpha_rel1.html"' in centralHtml and "Page1.html" not in centralHtml)
+        self.assertTrue(isValid, "Documentation.html does not list exactly the documents of the manifest.")
+
+    def test_phase_nestedCountsReachOuterPhase(self):
+        with patch.dict(DocParser.phases, clear=True):
+            with DocParser.phase("outer"):
+                DocParser.recordFiles(1, 10)
+                with DocParser.phase("inner"):
+                    DocParser.recordFiles(2, 100)
+            DocParser.recordFiles(5, 1000) # outside of any phase, counted nowhere
+            with DocParser.phase("outer"):
+                DocParser.recordFiles(1, 1)
+            outer, inner = DocParser.phases["outer"], DocParser.phases["inner"]
+
+            with self.assertLogs("DocParser", level="INFO") as logs:
+                DocParser.logPhaseSummary(1.5)
+
+        summaryLines = logs.output[-1].splitlines()
+        isValid = (
+            (outer.depth, outer.files, outer.bytes) == (0, 4, 111) and
+            (inner.depth, inner.files, inner.bytes) == (1, 2, 100) and
+            DocParser.activePhases == [] and
+            summaryLines[2].split() == ["outer", "%.3f" % outer.elapsed, "s", "4", "111"] and
+            summaryLines[3].startswith("  inner") and summaryLines[3].split()[-2:] == ["2", "100"] and
+            summaryLines[4].split() == ["Total", "1.500", "s"])
+        self.assertTrue(isValid, "Nested phases were not timed and counted under the phases around them.")
+
+if __name__ == '__main__':
+    unittest.main()